@@ -1,10 +1,24 @@
 import os
 import json
+import asyncio
 import logging
-import aiohttp
 import re
 from dotenv import load_dotenv
 from backend.prompts.prompts import INGREDIENT_ANALYSIS_PROMPT
+from typing import AsyncIterator, Callable, Optional
+from backend.app.llm_client import llm_client, LLMAPIError
+from backend.app.config import cfg
+from backend.app.inci import inci_resolver
+from backend.app.knowledge_base import ingredient_kb
+from backend.app.scoring import score_ingredients, backfill_assessment, assessment_disagreement
+from backend.app.streaming import JSONStreamParser
+from backend.app.cache import (
+    ingredient_cache,
+    analysis_cache,
+    analysis_fingerprint,
+    normalize_ingredient_name,
+    profile_key
+)
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -14,8 +28,12 @@ load_dotenv(dotenv_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Ingredient lists longer than this are analyzed in concurrent chunks
+ANALYSIS_CHUNK_SIZE = cfg["models"]["analysis"]["chunk_size"]
+MAX_PARALLEL_CHUNKS = cfg["models"]["analysis"]["max_parallel_chunks"]
+
+ANALYSIS_SYSTEM_MESSAGE = "You are a cosmetic chemist. Analyze ALL ingredients. Output ONLY valid JSON without any additional text."
+
 
 def extract_and_fix_json(text: str) -> dict:
     """Robust JSON extraction with advanced error correction"""
@@ -47,42 +65,313 @@ def extract_and_fix_json(text: str) -> dict:
             logger.error(f"JSON repair failed: {str(e)}")
             raise
 
-def fallback_analysis(ingredients: str = "") -> dict:
-    """Fallback analysis when Groq API fails"""
+def only_requested(records: list, requested_names: list) -> list:
+    """Records whose name is one that was asked for; renamed or invented ones must not reach the shared cache"""
+    requested = {normalize_ingredient_name(name) for name in requested_names}
+    return [rec for rec in records if normalize_ingredient_name(rec.get('name', '')) in requested]
+
+def provisional_analysis(ingredients: str, skin_type: str = "normal", concerns: list = None, cached: dict = None) -> dict:
+    """Instant report from cached and bundled ingredient facts, scored locally without the LLM"""
+    cached = cached or {}
+    records = {}
+    for ing in inci_resolver.canonicalize(ing.strip() for ing in ingredients.split(",")):
+        key = normalize_ingredient_name(ing)
+        if key and key not in records:
+            records[key] = cached.get(key) or knowledge_base_record(ing)
+
     return {
-        "overall_assessment": {
-            "safety_rating": "caution",
-            "barrier_impact": "neutral",
-            "allergy_risk": "medium",
-            "suitability_score": 3,
-            "key_concerns": ["Analysis unavailable"],
-            "personalized_notes": "Could not analyze ingredients. Please try again or check the ingredient list."
-        },
-        "ingredients": [
-            {
-                "name": "Unknown",
-                "function": "N/A",
-                "safety": "caution",
+        "overall_assessment": score_ingredients(list(records.values()), skin_type, concerns),
+        "ingredients": list(records.values())
+    }
+
+def fallback_analysis(ingredients: str = "", cached: dict = None, skin_type: str = "normal", concerns: list = None) -> dict:
+    """Fallback analysis when Groq API fails, built from cached and bundled ingredient facts"""
+    analysis = provisional_analysis(ingredients, skin_type, concerns, cached)
+    if not analysis["ingredients"]:
+        return {
+            "overall_assessment": {
+                "safety_rating": "caution",
                 "barrier_impact": "neutral",
-                "allergy_potential": "medium",
-                "special_concerns": ["Analysis failed"],
-                "personalized_notes": "Analysis unavailable"
-            }
-        ]
+                "allergy_risk": "medium",
+                "suitability_score": 3,
+                "key_concerns": ["Analysis unavailable"],
+                "personalized_notes": "Could not analyze ingredients. Please try again or check the ingredient list."
+            },
+            "ingredients": [missing_ingredient_placeholder("Unknown")]
+        }
+
+    overall = analysis["overall_assessment"]
+    overall["personalized_notes"] = "AI analysis is unavailable right now. " + overall["personalized_notes"]
+    return analysis
+
+def missing_ingredient_placeholder(name: str) -> dict:
+    """Placeholder record for an ingredient the model did not return"""
+    return {
+        "name": name,
+        "function": "Unknown",
+        "safety": "caution",
+        "barrier_impact": "neutral",
+        "allergy_potential": "medium",
+        "special_concerns": ["Analysis incomplete"],
+        "personalized_notes": "Could not analyze this ingredient"
     }
 
+def knowledge_base_record(name: str, personalized_notes: str = None) -> dict:
+    """Record built from bundled facts, or a placeholder for ingredients the knowledge base lacks"""
+    record = ingredient_kb.facts(name)
+    if record is None:
+        return missing_ingredient_placeholder(name)
+    record["personalized_notes"] = personalized_notes or "Personalized notes unavailable"
+    return record
+
+def merge_ingredient_analyses(ingredients_list: list, cached: dict, generated: list) -> tuple:
+    """Assemble per-ingredient records in label order from cached and freshly generated results.
+
+    Returns the records and how many of them are placeholders for ingredients
+    neither the cache nor the model covered.
+    """
+    generated_by_name = {}
+    for record in generated:
+        if record.get("name"):
+            generated_by_name.setdefault(normalize_ingredient_name(record["name"]), record)
+
+    merged = []
+    seen = set()
+    missing = 0
+    for ing in ingredients_list:
+        key = normalize_ingredient_name(ing)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        record = cached.get(key) or generated_by_name.pop(key, None)
+        if record is None:
+            missing += 1
+            record = missing_ingredient_placeholder(ing)
+        merged.append(record)
+
+    if missing:
+        logger.warning(f"Missing analysis for {missing} ingredients")
+
+    # Keep records the model returned under a different name (e.g. "Aqua" -> "Water")
+    merged.extend(record for key, record in generated_by_name.items() if key not in seen)
+    return merged, missing
+
+def with_known_facts(record: dict, known_keys: dict) -> dict:
+    """Bundled facts plus the model's notes for a known ingredient; other records unchanged"""
+    ing = known_keys.get(normalize_ingredient_name(record.get("name", "")))
+    if ing is None:
+        return record
+    return knowledge_base_record(ing, record.get("personalized_notes"))
+
+def fill_known_ingredients(generated: list, known: list) -> list:
+    """Combine bundled facts for known ingredients with the notes the model wrote for them"""
+    known_keys = {normalize_ingredient_name(ing): ing for ing in known}
+    filled = [with_known_facts(record, known_keys) for record in generated]
+
+    # Known ingredients the model skipped still get their facts
+    returned = {normalize_ingredient_name(record.get("name", "")) for record in generated}
+    filled.extend(knowledge_base_record(ing) for key, ing in known_keys.items() if key not in returned)
+    return filled
+
+async def request_analysis(prompt: str, on_part: Optional[Callable[[str, object], None]] = None) -> dict:
+    """Send one analysis prompt and return the repaired JSON response.
+
+    With on_part, the response is streamed and on_part(key, value) is called for
+    every "ingredients" element and the "overall_assessment" as soon as each is complete.
+    """
+    messages = [
+        {"role": "system", "content": ANALYSIS_SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt}
+    ]
+    if on_part is None:
+        response_content = await llm_client.complete("analysis", messages, response_format={"type": "json_object"})
+    else:
+        # JSON mode is not available for streamed completions; the prompt and repair step cover it
+        parser = JSONStreamParser()
+        async for delta in llm_client.stream("analysis", messages):
+            for kind, key, value in parser.feed(delta):
+                if (kind, key) in (("item", "ingredients"), ("field", "overall_assessment")):
+                    on_part(key, value)
+        response_content = parser.text
+
+    logger.info("Raw model output:\n%s", response_content)
+    return extract_and_fix_json(response_content)
+
+def chunk_prompt(to_analyze: list, known: list, skin_type: str, concerns_str: str) -> str:
+    """Per-ingredient analysis of one chunk; the overall assessment is built after merging"""
+    known_section = f"""
+    Ingredients with known facts:
+    {", ".join(known)}
+    For these, add an entry with ONLY "name" and "personalized_notes".
+    """ if known else ""
+
+    return f"""
+    ### USER'S SKIN PROFILE ###
+    Skin Type: {skin_type}
+    Concerns: {concerns_str}
+
+    ### ANALYSIS REQUEST ###
+    As a cosmetic chemist, analyze ALL {len(to_analyze)} skincare ingredients below for THIS specific user.
+    Ingredients to analyze:
+    {", ".join(to_analyze) if to_analyze else "None"}
+    {known_section}
+    For EACH ingredient, provide its function, safety (safe/caution/unsafe), barrier impact
+    (positive/neutral/negative), allergy potential (low/medium/high), special concerns and
+    2-3 lines of personalized notes for {skin_type} skin and {concerns_str} concerns.
+
+    Output ONLY valid JSON with double quotes and no trailing commas:
+    {{
+        "ingredients": [
+            {{
+                "name": "ingredient_name",
+                "function": "string",
+                "safety": "safe/caution/unsafe",
+                "barrier_impact": "positive/neutral/negative",
+                "allergy_potential": "low/medium/high",
+                "special_concerns": ["concern1", "concern2"],
+                "personalized_notes": "Notes for user's skin type"
+            }}
+        ]
+    }}
+    """
+
+def summary_prompt(records: list, skin_type: str, concerns_str: str) -> str:
+    """Overall notes and alternatives written from the merged per-ingredient results"""
+    condensed = [
+        {key: record[key] for key in ("name", "safety", "barrier_impact", "allergy_potential", "special_concerns") if key in record}
+        for record in records
+    ]
+    return f"""
+    ### USER'S SKIN PROFILE ###
+    Skin Type: {skin_type}
+    Concerns: {concerns_str}
+
+    ### ANALYZED INGREDIENTS ###
+    {json.dumps(condensed, separators=(",", ":"))}
+
+    Based on these results, write the key concerns for this user, detailed personalized notes
+    for the product as a whole, and recommend 2-3 alternative products (commercial and natural)
+    better suited to this user.
+
+    Output ONLY valid JSON:
+    {{
+        "key_concerns": ["list", "of", "concerns"],
+        "personalized_notes": "Detailed notes for user's skin type",
+        "alternative_products": [
+            {{
+                "brand": "Brand Name",
+                "product": "Product Name",
+                "type": "commercial/natural",
+                "reason": "Why it's better",
+                "key_ingredients": ["ingredient1", "ingredient2"]
+            }}
+        ]
+    }}
+    """
+
+async def analyze_in_chunks(uncached: list, skin_type: str, concerns: list, emit: Optional[Callable] = None) -> tuple:
+    """Analyze ingredients in concurrent chunks.
+
+    Returns the records from chunks that succeeded and stand-in records (bundled
+    facts or placeholders) for chunks that failed. Raises when every chunk failed.
+    """
+    concerns_str = ", ".join(concerns) if concerns else "none"
+    chunks = [uncached[i:i + ANALYSIS_CHUNK_SIZE] for i in range(0, len(uncached), ANALYSIS_CHUNK_SIZE)]
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_CHUNKS)
+
+    async def analyze_chunk(chunk: list) -> list:
+        known = [ing for ing in chunk if ing in ingredient_kb]
+        to_analyze = [ing for ing in chunk if ing not in ingredient_kb]
+        known_keys = {normalize_ingredient_name(ing): ing for ing in known}
+        on_part = (lambda key, record: emit("ingredient", with_known_facts(record, known_keys))) if emit else None
+        async with semaphore:
+            response = await request_analysis(chunk_prompt(to_analyze, known, skin_type, concerns_str), on_part)
+        return fill_known_ingredients(response.get("ingredients", []), known)
+
+    logger.info(f"Analyzing {len(uncached)} ingredients in {len(chunks)} chunks")
+    results = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+    generated, stand_ins = [], []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Analysis chunk failed: {result!r}")
+            stand_ins.extend(knowledge_base_record(ing) for ing in chunk)
+        else:
+            generated.extend(result)
+
+    if not generated:
+        raise RuntimeError("All analysis chunks failed")
+    return generated, stand_ins
+
 async def analyze_ingredients(
     ingredients_str: str,
     url: str = None,
     skin_type: str = "normal",
     concerns: list = None,
+    emit: Optional[Callable[[str, object], None]] = None
 ) -> dict:
-    """Analyze ingredients with user's skin profile"""
+    """Analyze ingredients with user's skin profile.
+
+    emit(event, data), when given, receives a provisional report and then each
+    ingredient record and the overall assessment as soon as they are available.
+    """
     concerns = concerns or []
     concerns_str = ", ".join(concerns) if concerns else "none"
     
-    # Split ingredients into a list
-    ingredients_list = [ing.strip() for ing in ingredients_str.split(",") if ing.strip()]
+    # Split ingredients into a list, using canonical INCI spellings so every
+    # source of the same ingredient shares its cache entries; only exact names
+    # and aliases are mapped here, misreadings are corrected on the OCR path
+    ingredients_list = inci_resolver.canonicalize(
+        ing.strip() for ing in ingredients_str.split(",") if ing.strip()
+    )
+
+    # Identical ingredient set and skin profile: reuse the whole report
+    fingerprint = analysis_fingerprint(ingredients_list, skin_type, concerns)
+    cached_report = await analysis_cache.get(fingerprint)
+    if cached_report:
+        if url:
+            cached_report['source_url'] = url
+        return cached_report
+
+    # Only send ingredients we have not analyzed before for this skin profile
+    cached = await ingredient_cache.get_many(ingredients_list, skin_type, concerns)
+    uncached = [ing for ing in ingredients_list if normalize_ingredient_name(ing) not in cached]
+    already_analyzed = [ing for ing in ingredients_list if normalize_ingredient_name(ing) in cached]
+
+    if emit:
+        # Instant local picture first, then the records that are already final
+        emit("provisional", provisional_analysis(", ".join(ingredients_list), skin_type, concerns, cached))
+        for ing in already_analyzed:
+            emit("ingredient", cached[normalize_ingredient_name(ing)])
+
+    # Long lists: concurrent chunks, overall assessment computed from the merged results
+    if len(uncached) > ANALYSIS_CHUNK_SIZE:
+        return await analyze_long_list(ingredients_list, uncached, cached, fingerprint, url, skin_type, concerns, emit)
+
+    # Static facts for known ingredients come from the bundled knowledge base;
+    # the model only writes their personalized notes
+    known = [ing for ing in uncached if ing in ingredient_kb]
+    to_analyze = [ing for ing in uncached if ing not in ingredient_kb]
+
+    if already_analyzed:
+        cached_section = f"""
+    Already analyzed ingredients (also in this product):
+    {", ".join(already_analyzed)}
+    Do NOT include these in the "ingredients" array, but DO take them into account for the overall assessment.
+    """
+    else:
+        cached_section = ""
+
+    if known:
+        known_section = f"""
+    Ingredients with known facts (also in this product):
+    {", ".join(known)}
+    For these, add an entry to the "ingredients" array with ONLY "name" and "personalized_notes".
+    """
+    else:
+        known_section = ""
+
     # Update the prompt to include alternative products
     prompt = f"""
     ### USER'S SKIN PROFILE ###
@@ -90,12 +379,13 @@ async def analyze_ingredients(
     Concerns: {concerns_str}
 
     ### ANALYSIS REQUEST ###
-    As a cosmetic chemist, analyze ALL {len(ingredients_list)} skincare ingredients below for THIS specific user.
+    As a cosmetic chemist, analyze ALL {len(to_analyze)} skincare ingredients below for THIS specific user.
     Analyze each ingredient COMPLETELY before moving to the next. DO NOT SKIP ANY INGREDIENT.
 
     Ingredients to analyze:
-    {", ".join(ingredients_list)}
-
+    {", ".join(to_analyze) if to_analyze else "None"}
+    {known_section}
+    {cached_section}
     For EACH ingredient, provide:
     1. Function in skincare
     2. Safety: safe/caution/unsafe
@@ -167,70 +457,121 @@ async def analyze_ingredients(
     }}
     """
    
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+    known_keys = {normalize_ingredient_name(ing): ing for ing in known}
 
-    payload = {
-        "model": "gemma2-9b-it",
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a cosmetic chemist. Analyze ALL ingredients. Output ONLY valid JSON without any additional text."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.0,  # Lower temperature for more consistent results
-        "max_tokens": 4000,   # Increased token limit
-        "response_format": {"type": "json_object"}
-    }
+    def on_part(key: str, value) -> None:
+        if key == "ingredients":
+            emit("ingredient", with_known_facts(value, known_keys))
+        else:
+            emit("overall_assessment", value)
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(GROQ_API_URL, json=payload, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Groq API error: {error_text}")
-                    return fallback_analysis(ingredients_str)
-
-                data = await response.json()
-                response_content = data["choices"][0]["message"]["content"]
-                logger.info("Raw model output:\n%s", response_content)
-
-                # Handle JSON parsing
-                try:
-                    analysis = extract_and_fix_json(response_content)
-                    
-                    # Verify all ingredients were analyzed
-                    analyzed_ingredients = [ing['name'] for ing in analysis.get('ingredients', [])]
-                    missing = [ing for ing in ingredients_list if ing not in analyzed_ingredients]
-                    
-                    if missing:
-                        logger.warning(f"Missing analysis for {len(missing)} ingredients")
-                        # Add placeholder for missing ingredients
-                        for ing in missing:
-                            analysis['ingredients'].append({
-                                "name": ing,
-                                "function": "Unknown",
-                                "safety": "caution",
-                                "barrier_impact": "neutral",
-                                "allergy_potential": "medium",
-                                "special_concerns": ["Analysis incomplete"],
-                                "personalized_notes": "Could not analyze this ingredient"
-                            })
-
-                    if url:       
-                     analysis['source_url'] = url
-                     print("there is a URL please consider this ",analysis["source_url"])
-                    return analysis
-                except Exception as e:
-                    logger.error(f"JSON parsing failed: {str(e)}")
-                    return fallback_analysis(ingredients_str)
-
+        analysis = await request_analysis(prompt, on_part if emit else None)
+    except LLMAPIError as e:
+        logger.error(f"Groq API error: {e.body}")
+        return fallback_analysis(", ".join(ingredients_list), cached, skin_type, concerns)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON parsing failed: {str(e)}")
+        return fallback_analysis(", ".join(ingredients_list), cached, skin_type, concerns)
     except Exception as e:
         logger.exception("Groq analysis failed")
-        return fallback_analysis(ingredients_str)
\ No newline at end of file
+        return fallback_analysis(", ".join(ingredients_list), cached, skin_type, concerns)
+
+    # Handle the parsed response
+    try:
+        generated = fill_known_ingredients(analysis.get('ingredients', []), known)
+
+        # Remember the new per-ingredient results for future products
+        await ingredient_cache.put_many(only_requested(generated, uncached), skin_type, concerns)
+
+        # Assemble the report from cached and generated records
+        analysis['ingredients'], missing = merge_ingredient_analyses(ingredients_list, cached, generated)
+
+        # Fill gaps in the model's overall assessment and flag large disagreements
+        local = score_ingredients(analysis['ingredients'], skin_type, concerns)
+        overall = backfill_assessment(analysis.setdefault('overall_assessment', {}), local)
+        gap = assessment_disagreement(overall, local)["suitability_score"]
+        if abs(gap) >= 2:
+            logger.warning(f"Model suitability {overall['suitability_score']} differs from local score {local['suitability_score']}")
+
+        # Reports patched with placeholders for ingredients the model skipped are not worth keeping
+        if not missing:
+            await analysis_cache.put(fingerprint, analysis, profile_key(skin_type, concerns))
+
+        if url:       
+         analysis['source_url'] = url
+         print("there is a URL please consider this ",analysis["source_url"])
+        return analysis
+    except Exception as e:
+        logger.error(f"JSON parsing failed: {str(e)}")
+        return fallback_analysis(", ".join(ingredients_list), cached, skin_type, concerns)
+
+async def analyze_long_list(
+    ingredients_list: list,
+    uncached: list,
+    cached: dict,
+    fingerprint: str,
+    url: str,
+    skin_type: str,
+    concerns: list,
+    emit: Optional[Callable] = None
+) -> dict:
+    """Chunked analysis of a long ingredient list, merged into the usual report schema"""
+    concerns_str = ", ".join(concerns) if concerns else "none"
+    try:
+        generated, stand_ins = await analyze_in_chunks(uncached, skin_type, concerns, emit)
+    except Exception as e:
+        logger.error(f"Chunked analysis failed: {str(e)}")
+        return fallback_analysis(", ".join(ingredients_list), cached, skin_type, concerns)
+
+    await ingredient_cache.put_many(only_requested(generated, uncached), skin_type, concerns)
+    records, missing = merge_ingredient_analyses(ingredients_list, cached, generated + stand_ins)
+
+    # Ratings come from the merged records; the model only writes the prose and alternatives
+    overall = score_ingredients(records, skin_type, concerns)
+    overall.pop("provisional")
+    analysis = {"overall_assessment": overall, "ingredients": records}
+    try:
+        summary = await request_analysis(summary_prompt(records, skin_type, concerns_str))
+        if summary.get("key_concerns"):
+            overall["key_concerns"] = summary["key_concerns"]
+        if summary.get("personalized_notes"):
+            overall["personalized_notes"] = summary["personalized_notes"]
+        analysis["alternative_products"] = summary.get("alternative_products", [])
+    except Exception as e:
+        logger.error(f"Analysis summary failed: {str(e)}")
+    if emit:
+        emit("overall_assessment", overall)
+
+    # Reports patched with stand-ins for failed chunks are not worth keeping
+    if not stand_ins and not missing:
+        await analysis_cache.put(fingerprint, analysis, profile_key(skin_type, concerns))
+
+    if url:
+        analysis['source_url'] = url
+    return analysis
+
+async def stream_analysis(
+    ingredients_str: str,
+    url: str = None,
+    skin_type: str = "normal",
+    concerns: list = None
+) -> AsyncIterator[tuple]:
+    """Yield (event, data) pairs while analyze_ingredients runs, ending with ("complete", analysis)"""
+    queue = asyncio.Queue()
+    task = asyncio.create_task(analyze_ingredients(
+        ingredients_str,
+        url=url,
+        skin_type=skin_type,
+        concerns=concerns,
+        emit=lambda event, data: queue.put_nowait((event, data))
+    ))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while (item := await queue.get()) is not None:
+            yield item
+        yield "complete", task.result()
+    finally:
+        # The client went away mid-stream: stop generating
+        task.cancel()
@@ -0,0 +1,223 @@
+import re
+import asyncio
+import hashlib
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo import ASCENDING, DESCENDING
+from backend.app.database import mongodb
+from backend.app.cache import profile_key
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words that only point at the product or the asker; everything else, including
+# "use", "with" and "good", is part of what the question asks
+FILLER_WORDS = frozenset("a an the this it its product i me you please".split())
+
+# Question and function words: kept in keys, but a question needs two other terms
+# ("What is retinol?" has one) before its answer is reused
+QUESTION_WORDS = frozenset((
+    "what is are can could does do did will would should there how why when which who "
+    "for with in on of to and or at by from be am during while if"
+).split())
+
+# A question needs this many content terms to be specific enough to cache
+MIN_CONTENT_TERMS = 2
+
+# Spellings folded together so rephrasings share a key
+SYNONYMS = {
+    "pregnant": "pregnancy",
+    "nursing": "breastfeeding",
+    "mix": "combine",
+    "mixing": "combine",
+    "layer": "combine",
+    "layering": "combine",
+    "together": "combine",
+    "alongside": "combine",
+    "retinoid": "retinol",
+    "tretinoin": "retinol",
+    "spf": "sunscreen",
+    "sunblock": "sunscreen",
+    # Kept apart from "safe": these ask the opposite question
+    "harmful": "unsafe",
+    "dangerous": "unsafe",
+    "toxic": "unsafe"
+}
+
+
+def question_terms(question: str) -> List[str]:
+    """Sorted, de-duplicated words of a question, with plurals and synonyms folded.
+
+    Unlike retrieval.tokenize, single characters are kept so "vitamin c" and
+    "vitamin e" stay apart.
+    """
+    terms = set()
+    for word in re.findall(r"[a-z0-9]+", question.lower()):
+        if word in FILLER_WORDS:
+            continue
+        # Synonyms are looked up before plural folding so "dangerous" is not read as a plural
+        if word not in SYNONYMS:
+            if len(word) > 4 and word.endswith("ies"):
+                word = word[:-3] + "y"
+            elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+        terms.add(SYNONYMS.get(word, word))
+    return sorted(terms)
+
+
+def content_terms(terms: List[str]) -> set:
+    return {term for term in terms if term not in QUESTION_WORDS}
+
+
+def is_cacheable(terms: List[str]) -> bool:
+    return len(content_terms(terms)) >= MIN_CONTENT_TERMS
+
+
+def jaccard(a: List[str], b: List[str]) -> float:
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def question_similarity(a: List[str], b: List[str]) -> float:
+    """Jaccard similarity of two questions' terms, 0 unless they ask about the same things"""
+    if content_terms(a) != content_terms(b):
+        return 0.0
+    return jaccard(a, b)
+
+
+class ChatAnswerCache:
+    """Answers to self-contained chat questions, shared across users of a report.
+
+    Entries are scoped by report fingerprint and skin profile. A question hits
+    when its normalized terms equal a stored question's, or when both share the
+    same content terms and the Jaccard similarity of their full term sets
+    reaches ``min_similarity`` (rephrasings like "can I" / "could I"). Questions
+    with fewer than two content terms are never cached. Entries expire through
+    a TTL index; ``hits`` counts how often each answer was reused.
+    """
+
+    def __init__(self, collection_name: str, ttl: timedelta, min_similarity: float, max_candidates: int):
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self._indexes_ready = False
+
+    @property
+    def collection(self):
+        return mongodb.get_db()[self.collection_name]
+
+    async def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index([("scope", ASCENDING), ("last_hit_at", DESCENDING)])
+        self._indexes_ready = True
+
+    @staticmethod
+    def _scope(fingerprint: str, skin_type: str, concerns: Optional[list]) -> str:
+        return f"{fingerprint}|{profile_key(skin_type, concerns)}"
+
+    @staticmethod
+    def _key(scope: str, terms: List[str]) -> str:
+        return hashlib.sha256(f"{scope}|{' '.join(terms)}".encode("utf-8")).hexdigest()
+
+    async def get(self, question: str, fingerprint: str, skin_type: str, concerns: Optional[list]) -> Optional[dict]:
+        """Cached {"response", "sources"} for the question or a close rephrasing of it"""
+        terms = question_terms(question)
+        if not is_cacheable(terms):
+            return None
+        scope = self._scope(fingerprint, skin_type, concerns)
+        now = datetime.utcnow()
+
+        try:
+            document = await self.collection.find_one({"_id": self._key(scope, terms), "expires_at": {"$gt": now}})
+            if document is None:
+                best, best_score = None, max(self.min_similarity, 1e-9)
+                cursor = self.collection.find(
+                    {"scope": scope, "expires_at": {"$gt": now}},
+                    {"terms": 1}
+                ).sort("last_hit_at", DESCENDING).limit(self.max_candidates)
+                async for candidate in cursor:
+                    score = question_similarity(terms, candidate["terms"])
+                    if score >= best_score:
+                        best, best_score = candidate, score
+                if best is None:
+                    return None
+                document = {"_id": best["_id"]}
+
+            document = await self.collection.find_one_and_update(
+                {"_id": document["_id"]},
+                {"$inc": {"hits": 1}, "$set": {"last_hit_at": now}},
+                projection={"question": 1, "answer": 1, "sources": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Chat answer cache lookup failed: {str(e)}")
+            return None
+
+        if document is None:
+            return None
+        logger.info(f"Chat answer cache hit for '{question}' (stored as '{document['question']}')")
+        return {"response": document["answer"], "sources": document.get("sources", [])}
+
+    async def put(self, question: str, fingerprint: str, skin_type: str, concerns: Optional[list], answer: dict) -> None:
+        terms = question_terms(question)
+        if not is_cacheable(terms):
+            return
+        scope = self._scope(fingerprint, skin_type, concerns)
+        now = datetime.utcnow()
+        try:
+            await self._ensure_indexes()
+            await self.collection.update_one(
+                {"_id": self._key(scope, terms)},
+                {
+                    "$set": {
+                        "scope": scope,
+                        "question": question,
+                        "terms": terms,
+                        "answer": answer["response"],
+                        "sources": answer.get("sources", []),
+                        "created_at": now,
+                        "last_hit_at": now,
+                        "expires_at": now + self.ttl
+                    },
+                    "$setOnInsert": {"hits": 0}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Chat answer cache write failed: {str(e)}")
+
+    async def top(self, limit: int) -> List[dict]:
+        """Most reused answers, candidates for precomputing"""
+        cursor = self.collection.find(
+            {"hits": {"$gt": 0}},
+            {"question": 1, "scope": 1, "hits": 1, "last_hit_at": 1}
+        ).sort("hits", DESCENDING).limit(limit)
+        return [document async for document in cursor]
+
+
+chat_answer_cache = ChatAnswerCache(
+    cfg["cache"]["chat_answers"]["collection"],
+    ttl=timedelta(hours=cfg["cache"]["chat_answers"]["ttl_hours"]),
+    min_similarity=cfg["cache"]["chat_answers"]["min_similarity"],
+    max_candidates=cfg["cache"]["chat_answers"]["max_candidates"]
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List the most reused cached chat answers")
+    parser.add_argument("--top", type=int, default=20, help="number of entries to show")
+    args = parser.parse_args()
+
+    for document in asyncio.run(chat_answer_cache.top(args.top)):
+        report, _, profile = document["scope"].partition("|")
+        print(f"{document['hits']:>5}  {document['question']}  [report {report[:12]}, {profile or 'no profile'}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import re
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import ASCENDING, UpdateOne
+from backend.app.database import mongodb
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_ingredient_name(name: str) -> str:
+    """Normalize an ingredient name so spelling/casing variants share a cache key"""
+    name = name.lower()
+    name = re.sub(r"[^\w\s\-/]", " ", name)  # Drop punctuation except hyphens and slashes
+    name = re.sub(r"\s+", " ", name)
+    return name.strip()
+
+
+def profile_key(skin_type: str, concerns: Optional[list]) -> str:
+    """Build a stable key for a user's skin profile"""
+    concerns_part = ",".join(sorted(c.strip().lower() for c in (concerns or []) if c.strip()))
+    return f"{(skin_type or '').strip().lower()}|{concerns_part}"
+
+
+class IngredientCache:
+    """Persistent per-ingredient analysis store, keyed by ingredient and skin profile"""
+
+    def __init__(self, collection_name: str = "ingredient_cache"):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self):
+        return mongodb.get_db()[self.collection_name]
+
+    @staticmethod
+    def _key(ingredient: str, profile: str) -> str:
+        return f"{profile}|{normalize_ingredient_name(ingredient)}"
+
+    async def get_many(self, ingredients: List[str], skin_type: str, concerns: Optional[list]) -> Dict[str, dict]:
+        """Return cached analyses keyed by normalized ingredient name"""
+        profile = profile_key(skin_type, concerns)
+        keys = list({self._key(ing, profile) for ing in ingredients})
+        if not keys:
+            return {}
+
+        cached = {}
+        try:
+            cursor = self.collection.find({"_id": {"$in": keys}})
+            async for document in cursor:
+                cached[document["ingredient"]] = document["analysis"]
+        except Exception as e:
+            # The cache is an optimisation; a Mongo hiccup should only cost a full analysis
+            logger.warning(f"Ingredient cache lookup failed: {str(e)}")
+            return {}
+
+        logger.info(f"Ingredient cache: {len(cached)} hits, {len(keys) - len(cached)} misses")
+        return cached
+
+    async def put_many(self, analyses: List[dict], skin_type: str, concerns: Optional[list]) -> None:
+        """Store freshly generated per-ingredient analyses"""
+        profile = profile_key(skin_type, concerns)
+        now = datetime.utcnow()
+        operations = []
+        for analysis in analyses:
+            name = analysis.get("name")
+            if not name:
+                continue
+            operations.append(UpdateOne(
+                {"_id": self._key(name, profile)},
+                {"$set": {
+                    "ingredient": normalize_ingredient_name(name),
+                    "profile": profile,
+                    "analysis": analysis,
+                    "updated_at": now
+                }},
+                upsert=True
+            ))
+
+        if not operations:
+            return
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Ingredient cache write failed: {str(e)}")
+
+
+def analysis_fingerprint(ingredients: List[str], skin_type: str, concerns: Optional[list]) -> str:
+    """Content address of a product analysis: the ingredient set plus the skin profile"""
+    canonical = {
+        "ingredients": sorted({normalize_ingredient_name(ing) for ing in ingredients if ing.strip()}),
+        "profile": profile_key(skin_type, concerns)
+    }
+    return hashlib.sha256(json.dumps(canonical, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Whole-product analysis cache shared by every worker through MongoDB.
+
+    Entries expire through a TTL index on ``expires_at``; when the collection grows
+    past ``max_entries`` the least recently read entries are evicted.
+    """
+
+    def __init__(self, collection_name: str, ttl: timedelta, max_entries: int):
+        self.collection_name = collection_name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._indexes_ready = False
+
+    @property
+    def collection(self):
+        return mongodb.get_db()[self.collection_name]
+
+    async def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index([("last_accessed", ASCENDING)])
+        self._indexes_ready = True
+
+    async def get(self, fingerprint: str) -> Optional[dict]:
+        """Return the cached analysis and mark it as recently used"""
+        now = datetime.utcnow()
+        try:
+            document = await self.collection.find_one_and_update(
+                {"_id": fingerprint, "expires_at": {"$gt": now}},
+                {"$set": {"last_accessed": now}, "$inc": {"hits": 1}},
+                projection={"analysis": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {str(e)}")
+            return None
+
+        if document:
+            logger.info(f"Analysis cache hit for {fingerprint[:12]}")
+            return document["analysis"]
+        return None
+
+    async def put(self, fingerprint: str, analysis: dict, profile: str = "") -> None:
+        """Store an analysis and evict least recently used entries over the size limit"""
+        now = datetime.utcnow()
+        try:
+            await self._ensure_indexes()
+            await self.collection.update_one(
+                {"_id": fingerprint},
+                {"$set": {
+                    "analysis": analysis,
+                    "profile": profile,
+                    "created_at": now,
+                    "last_accessed": now,
+                    "expires_at": now + self.ttl,
+                    "hits": 0
+                }},
+                upsert=True
+            )
+            await self._evict()
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {str(e)}")
+
+    async def _evict(self) -> None:
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+
+        cursor = self.collection.find({}, {"_id": 1}).sort("last_accessed", ASCENDING).limit(excess)
+        stale_ids = [document["_id"] async for document in cursor]
+        if stale_ids:
+            await self.collection.delete_many({"_id": {"$in": stale_ids}})
+            logger.info(f"Evicted {len(stale_ids)} least recently used analyses")
+
+
+class PerceptualHashCache:
+    """In-process LRU cache keyed by perceptual image hashes.
+
+    An exact hash hit is a dictionary lookup. With ``max_distance`` above zero,
+    the closest stored hash within that many differing bits also counts as a
+    near-duplicate hit; this is off by default because a label differing in one
+    word can sit closer to the original than a resized copy of it.
+    """
+
+    def __init__(self, max_entries: int, max_distance: int):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[int, str]" = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, image_hash: int) -> Optional[str]:
+        if image_hash in self._entries:
+            self._entries.move_to_end(image_hash)
+            self.hits += 1
+            return self._entries[image_hash]
+
+        if self.max_distance <= 0:
+            self.misses += 1
+            return None
+
+        best_hash, best_distance = None, self.max_distance + 1
+        for stored_hash in self._entries:
+            distance = (stored_hash ^ image_hash).bit_count()
+            if distance < best_distance:
+                best_hash, best_distance = stored_hash, distance
+
+        if best_hash is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(best_hash)
+        self.near_hits += 1
+        return self._entries[best_hash]
+
+    def put(self, image_hash: int, value: str) -> None:
+        self._entries[image_hash] = value
+        self._entries.move_to_end(image_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0
+        }
+
+
+ingredient_cache = IngredientCache()
+
+analysis_cache = AnalysisCache(
+    cfg["cache"]["analysis"]["collection"],
+    ttl=timedelta(hours=cfg["cache"]["analysis"]["ttl_hours"]),
+    max_entries=cfg["cache"]["analysis"]["max_entries"]
+)
+
+ocr_text_cache = PerceptualHashCache(
+    max_entries=cfg["cache"]["ocr"]["max_entries"],
+    max_distance=cfg["cache"]["ocr"]["max_distance"]
+)
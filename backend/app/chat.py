@@ -1,7 +1,9 @@
 import os
 import logging
-import aiohttp
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
+from backend.app.llm_client import llm_client, LLMAPIError
+from backend.app.chat_context import render_chat_context
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -12,53 +14,45 @@ load_dotenv(dotenv_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+CHAT_ERROR_RESPONSE = "I'm having trouble answering that. Please try again later."
+CHAT_FAILURE_RESPONSE = "I'm experiencing technical difficulties. Please try again later."
+CHAT_SOURCES = ["Cosmetic Ingredient Review", "PubMed research"]
 
-async def get_chat_response(
+
+def is_failed_answer(answer: str) -> bool:
+    """True for answers that ended in an error message and should not be remembered"""
+    return answer.rstrip().endswith((CHAT_ERROR_RESPONSE, CHAT_FAILURE_RESPONSE))
+
+
+def build_chat_messages(
     question: str,
     context: dict,
     skin_type: str,
-    concerns: list
-) -> dict:
-    """
-    Get personalized AI response about product analysis
+    concerns: list,
+    history: Optional[dict] = None
+) -> list:
+    """Chat messages answering a question about a report's compact chat context.
+
+    ``history`` is a chat session (running summary plus recent turns); recent
+    turns are replayed as messages and the summary goes into the prompt.
     """
+    history = history or {"summary": "", "turns": []}
+    turns = history["turns"]
+
     # Prepare context with user profile
     concerns_str = ", ".join(concerns) if concerns else "no specific concerns"
+    # Follow-ups like "what about the second one?" retrieve against the previous question too
+    retrieval_query = " ".join([t["question"] for t in turns[-1:]] + [question])
     
     context_str = (
         f"### USER'S SKIN PROFILE ###\n"
         f"Skin Type: {skin_type}\n"
         f"Concerns: {concerns_str}\n\n"
         "### PRODUCT ANALYSIS REPORT ###\n"
+        f"{render_chat_context(context, retrieval_query)}\n"
     )
-    
-    # Add overall assessment
-    overall = context.get("overall_assessment", {})
-    context_str += (
-        f"Overall Assessment:\n"
-        f"Safety Rating: {overall.get('safety_rating', 'unknown')}\n"
-        f"Barrier Impact: {overall.get('barrier_impact', 'unknown')}\n"
-        f"Allergy Risk: {overall.get('allergy_risk', 'unknown')}\n"
-        f"Suitability Score: {overall.get('suitability_score', 'unknown')}\n"
-        f"Key Concerns: {', '.join(overall.get('key_concerns', []))}\n"
-        f"Personalized Notes: {overall.get('personalized_notes', '')}\n\n"
-    )
-    
-    # Add ingredients analysis
-    context_str += "Ingredients Analysis:\n"
-    for ingredient in context.get("ingredients", []):
-        context_str += (
-            f"- {ingredient['name']}:\n"
-            f"  Function: {ingredient.get('function', '')}\n"
-            f"  Safety: {ingredient.get('safety', 'unknown')}\n"
-            f"  Barrier Impact: {ingredient.get('barrier_impact', 'unknown')}\n"
-            f"  Allergy Potential: {ingredient.get('allergy_potential', 'unknown')}\n"
-            f"  Natural Alternatives: {', '.join(ingredient.get('natural_alternatives', []))}\n"
-            f"  Special Concerns: {', '.join(ingredient.get('special_concerns', []))}\n"
-            f"  Personalized Notes: {ingredient.get('personalized_notes', '')}\n\n"
-        )
+    if history["summary"]:
+        context_str += f"\n### EARLIER CONVERSATION ###\n{history['summary']}\n"
     
     # Prepare prompt with personalization guidelines
     prompt = f"""
@@ -89,49 +83,69 @@ async def get_chat_response(
     13. Provide URL links to sources when possible and if of the article from where you get the information
     """
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": "llama3-70b-8192",
-        "messages": [
-            {
-                "role": "system",
-                "content": "You are a cosmetic chemist with 20 years of experience."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.5,
-        "max_tokens": 1500
-    }
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a cosmetic chemist with 20 years of experience."
+        }
+    ]
+    for turn in turns:
+        messages.append({"role": "user", "content": turn["question"]})
+        messages.append({"role": "assistant", "content": turn["answer"]})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+async def get_chat_response(
+    question: str,
+    context: dict,
+    skin_type: str,
+    concerns: list,
+    history: Optional[dict] = None
+) -> dict:
+    """
+    Get personalized AI response about product analysis
+    """
+    messages = build_chat_messages(question, context, skin_type, concerns, history)
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(GROQ_API_URL, json=payload, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"Groq API error: Status {response.status}, Response: {error_text}")
-                    return {
-                        "response": "I'm having trouble answering that. Please try again later.",
-                        "sources": []
-                    }
-
-                data = await response.json()
-                response_content = data["choices"][0]["message"]["content"]
-                
-                return {
-                    "response": response_content,
-                    "sources": ["Cosmetic Ingredient Review", "PubMed research"]
-                }
+        response_content = await llm_client.complete("chat", messages)
+        return {
+            "response": response_content,
+            "sources": CHAT_SOURCES
+        }
 
+    except LLMAPIError as e:
+        logger.error(f"Groq API error: Status {e.status}, Response: {e.body}")
+        return {
+            "response": CHAT_ERROR_RESPONSE,
+            "sources": []
+        }
     except Exception as e:
         logger.exception("Chat failed")
         return {
-            "response": "I'm experiencing technical difficulties. Please try again later.",
+            "response": CHAT_FAILURE_RESPONSE,
             "sources": []
-        }
\ No newline at end of file
+        }
+
+
+async def stream_chat_response(
+    question: str,
+    context: dict,
+    skin_type: str,
+    concerns: list,
+    history: Optional[dict] = None
+) -> AsyncIterator[str]:
+    """Yield the answer to a question token by token as the model generates it"""
+    messages = build_chat_messages(question, context, skin_type, concerns, history)
+    started = False
+
+    try:
+        async for delta in llm_client.stream("chat", messages):
+            started = True
+            yield delta
+    except LLMAPIError as e:
+        logger.error(f"Groq API error: Status {e.status}, Response: {e.body}")
+        yield CHAT_ERROR_RESPONSE if not started else f"\n\n{CHAT_ERROR_RESPONSE}"
+    except Exception as e:
+        logger.exception("Streamed chat failed")
+        yield CHAT_FAILURE_RESPONSE if not started else f"\n\n{CHAT_FAILURE_RESPONSE}"
\ No newline at end of file
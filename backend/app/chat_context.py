@@ -0,0 +1,221 @@
+import re
+import json
+import hashlib
+import logging
+from typing import Optional
+from backend.app.cache import normalize_ingredient_name
+from backend.app.config import cfg
+from backend.app.retrieval import BM25Index
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+chat_cfg = cfg["chat"]
+CONTEXT_TOKEN_BUDGET = chat_cfg["context_token_budget"]
+NOTES_MAX_CHARS = chat_cfg["notes_max_chars"]
+RETRIEVAL_TOP_K = chat_cfg["retrieval_top_k"]
+
+# Bumped whenever the stored layout changes so old contexts get rebuilt
+CHAT_CONTEXT_VERSION = 3
+
+INGREDIENT_FIELDS = ("function", "safety", "barrier_impact", "allergy_potential", "special_concerns", "personalized_notes")
+
+FIELD_LABELS = {
+    "function": "function",
+    "safety": "safety",
+    "barrier_impact": "barrier",
+    "allergy_potential": "allergy",
+    "special_concerns": "concerns",
+    "personalized_notes": "notes"
+}
+
+# Question keywords that make an ingredient field worth sending
+FIELD_KEYWORDS = {
+    "function": ("what does", "what is", "purpose", "function", "role", "used for"),
+    "safety": ("safe", "toxic", "danger", "harm", "pregnan", "cancer", "risk"),
+    "barrier_impact": ("barrier", "dry", "moistur", "hydrat", "strip"),
+    "allergy_potential": ("allerg", "react", "sensitiv", "rash", "itch", "irritat"),
+    "special_concerns": (
+        "concern", "avoid", "bad", "worse", "acne", "pore", "clog", "break", "irritat", "pregnan",
+        "fragrance", "sulfate", "paraben", "alcohol", "retino", "acid", "sun"
+    ),
+    "personalized_notes": ("why", "suit", "good for", "my skin", "recommend", "benefit", "help", "work")
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English prompt text (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = re.sub(r"\s+", " ", str(text or "")).strip()
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def report_fingerprint(analysis: dict) -> str:
+    """Content address of a report; chat sessions and answers are keyed by it"""
+    canonical = json.dumps(analysis, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_chat_context(analysis: dict) -> dict:
+    """Condensed copy of a report holding only what chat prompts use.
+
+    Built once when the report is saved; values are pre-shortened strings so
+    rendering per question is just selection and joining.
+    """
+    overall = analysis.get("overall_assessment", {})
+    ingredients = []
+    for record in analysis.get("ingredients", []):
+        name = record.get("name")
+        if not name or name == "Unknown":
+            continue
+        entry = {"name": name, "key": normalize_ingredient_name(name)}
+        for field in INGREDIENT_FIELDS:
+            value = record.get(field)
+            if isinstance(value, list):
+                value = "; ".join(str(v) for v in value if v)
+            if value and str(value).strip().lower() not in ("unknown", "n/a"):
+                entry[field] = _shorten(value, NOTES_MAX_CHARS)
+        ingredients.append(entry)
+
+    # The name is repeated so questions naming an ingredient rank it above ones merely mentioning it
+    index = BM25Index.build([
+        " ".join([entry["name"], entry["name"]] + [entry[field] for field in INGREDIENT_FIELDS if field in entry])
+        for entry in ingredients
+    ])
+
+    return {
+        "version": CHAT_CONTEXT_VERSION,
+        "fingerprint": report_fingerprint(analysis),
+        "overall": {
+            "safety_rating": overall.get("safety_rating", "unknown"),
+            "barrier_impact": overall.get("barrier_impact", "unknown"),
+            "allergy_risk": overall.get("allergy_risk", "unknown"),
+            "suitability_score": overall.get("suitability_score", "unknown"),
+            "key_concerns": "; ".join(overall.get("key_concerns", [])),
+            "personalized_notes": _shorten(overall.get("personalized_notes", ""), 2 * NOTES_MAX_CHARS)
+        },
+        "ingredients": ingredients,
+        "index": index.to_dict()
+    }
+
+
+def relevant_fields(question: str) -> set:
+    """Ingredient fields the question touches; every field for open-ended questions"""
+    text = question.lower()
+    fields = {field for field, keywords in FIELD_KEYWORDS.items() if any(k in text for k in keywords)}
+    if not fields:
+        return set(INGREDIENT_FIELDS)
+    # Function is cheap and anchors every ingredient line
+    return fields | {"function"}
+
+
+def mentioned_ingredients(question: str, context: dict) -> set:
+    """Keys of ingredients named in the question"""
+    text = f" {normalize_ingredient_name(question)} "
+    return {entry["key"] for entry in context["ingredients"] if f" {entry['key']} " in text}
+
+
+def select_ingredients(context: dict, question: str, k: int = RETRIEVAL_TOP_K) -> list:
+    """Indices of the ingredients worth sending for a question, in label order.
+
+    Named ingredients are always kept; the BM25 index over the report fills up
+    to k, and label order (highest concentration first) fills whatever the
+    question does not match.
+    """
+    entries = context["ingredients"]
+    if len(entries) <= k:
+        return list(range(len(entries)))
+
+    mentioned = mentioned_ingredients(question, context)
+    selected = [i for i, entry in enumerate(entries) if entry["key"] in mentioned]
+    for i in BM25Index.from_dict(context["index"]).top_k(question, k):
+        if len(selected) >= max(k, len(mentioned)):
+            break
+        if i not in selected:
+            selected.append(i)
+    for i in range(len(entries)):
+        if len(selected) >= k:
+            break
+        if i not in selected:
+            selected.append(i)
+    return sorted(selected)
+
+
+def _ingredient_line(entry: dict, fields) -> str:
+    parts = [f"{FIELD_LABELS[field]}: {entry[field]}" for field in INGREDIENT_FIELDS if field in fields and field in entry]
+    return f"- {entry['name']}" + (f" ({'; '.join(parts)})" if parts else "")
+
+
+def render_chat_context(
+    context: dict,
+    question: str,
+    budget: int = CONTEXT_TOKEN_BUDGET
+) -> str:
+    """Render the report part of a chat prompt within a token budget.
+
+    Only the ingredients select_ingredients picks are considered, so the size
+    stays flat however long the label is. Ingredients named in the question get
+    every field; the rest get only the fields the question is about, in label
+    order, until the budget runs out. Ingredients that do not fit are listed by
+    name only.
+    """
+    overall = context["overall"]
+    lines = [
+        "Overall Assessment:",
+        f"Safety Rating: {overall['safety_rating']} | Barrier Impact: {overall['barrier_impact']} | "
+        f"Allergy Risk: {overall['allergy_risk']} | Suitability Score: {overall['suitability_score']}",
+    ]
+    if overall["key_concerns"]:
+        lines.append(f"Key Concerns: {overall['key_concerns']}")
+    if overall["personalized_notes"]:
+        lines.append(f"Personalized Notes: {overall['personalized_notes']}")
+    lines.append("")
+    lines.append("Ingredients (label order):")
+
+    selected = select_ingredients(context, question)
+    entries = [context["ingredients"][i] for i in selected]
+    omitted = len(context["ingredients"]) - len(entries)
+    fields = relevant_fields(question)
+    mentioned = mentioned_ingredients(question, context)
+    # Named ingredients first, then the ones with concerns when the question is about them
+    concern_first = "special_concerns" in fields and len(fields) < len(INGREDIENT_FIELDS)
+    ordered = sorted(
+        range(len(entries)),
+        key=lambda i: (entries[i]["key"] not in mentioned, concern_first and "special_concerns" not in entries[i], i)
+    )
+
+    used = estimate_tokens("\n".join(lines))
+    detailed, overflow = {}, []
+    for i in ordered:
+        entry = entries[i]
+        line = _ingredient_line(entry, INGREDIENT_FIELDS if entry["key"] in mentioned else fields)
+        cost = estimate_tokens(line)
+        if used + cost <= budget or entry["key"] in mentioned:
+            detailed[i] = line
+            used += cost
+        else:
+            overflow.append(i)
+
+    lines.extend(detailed[i] for i in sorted(detailed))
+    if overflow:
+        names = []
+        for i in sorted(overflow):
+            name = entries[i]["name"]
+            if used + estimate_tokens(name) + 1 > budget:
+                names.append(f"and {len(overflow) - len(names)} more")
+                break
+            names.append(name)
+            used += estimate_tokens(name) + 1
+        lines.append(f"Other ingredients: {', '.join(names)}")
+    if omitted:
+        lines.append(f"({omitted} further ingredients not relevant to this question are omitted)")
+
+    return "\n".join(lines)
+
+
+def is_current(context: Optional[dict]) -> bool:
+    return bool(context) and context.get("version") == CHAT_CONTEXT_VERSION
@@ -0,0 +1,139 @@
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from pymongo import ReturnDocument
+from backend.app.database import mongodb
+from backend.app.llm_client import llm_client
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+chat_cfg = cfg["chat"]
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+
+class ChatSessionStore:
+    """Server-side chat history per user and report.
+
+    Keeps the last ``window_turns`` question/answer pairs verbatim (answers
+    capped at ``answer_max_chars``) and folds older turns into a running
+    summary of at most ``summary_max_chars``, so the history part of a prompt
+    is bounded however long the conversation runs. Sessions expire through a
+    TTL index once idle for ``ttl``.
+    """
+
+    def __init__(self, collection_name: str, window_turns: int, answer_max_chars: int, summary_max_chars: int, ttl: timedelta):
+        self.collection_name = collection_name
+        self.window_turns = window_turns
+        self.answer_max_chars = answer_max_chars
+        self.summary_max_chars = summary_max_chars
+        self.ttl = ttl
+        self._indexes_ready = False
+
+    @property
+    def collection(self):
+        return mongodb.get_db()[self.collection_name]
+
+    @staticmethod
+    def _key(email: str, report_id: str) -> str:
+        return f"{email}|{report_id}"
+
+    async def _ensure_indexes(self) -> None:
+        if self._indexes_ready:
+            return
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
+
+    async def get(self, email: str, report_id: str) -> dict:
+        """The session's summary and recent turns (empty for a new conversation)"""
+        try:
+            document = await self.collection.find_one(
+                {"_id": self._key(email, report_id)},
+                {"summary": 1, "turns": 1}
+            )
+        except Exception as e:
+            # Losing history degrades answers to stateless ones, it should not fail the chat
+            logger.warning(f"Chat session lookup failed: {str(e)}")
+            document = None
+        document = document or {}
+        return {"summary": document.get("summary", ""), "turns": document.get("turns", [])}
+
+    async def append(self, email: str, report_id: str, question: str, answer: str) -> None:
+        """Record a turn, folding turns that leave the window into the summary"""
+        now = datetime.utcnow()
+        turn = {"question": _shorten(question, self.answer_max_chars), "answer": _shorten(answer, self.answer_max_chars)}
+        try:
+            await self._ensure_indexes()
+            before = await self.collection.find_one_and_update(
+                {"_id": self._key(email, report_id)},
+                {
+                    "$push": {"turns": {"$each": [turn], "$slice": -self.window_turns}},
+                    "$inc": {"turn_count": 1},
+                    "$set": {"updated_at": now, "expires_at": now + self.ttl},
+                    "$setOnInsert": {"summary": "", "created_at": now}
+                },
+                projection={"summary": 1, "turns": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except Exception as e:
+            logger.warning(f"Chat session write failed: {str(e)}")
+            return
+
+        turns = (before or {}).get("turns", []) + [turn]
+        evicted = turns[:-self.window_turns]
+        if not evicted:
+            return
+
+        summary = await self.summarize((before or {}).get("summary", ""), evicted)
+        try:
+            await self.collection.update_one({"_id": self._key(email, report_id)}, {"$set": {"summary": summary}})
+        except Exception as e:
+            logger.warning(f"Chat session summary write failed: {str(e)}")
+
+    async def summarize(self, summary: str, turns: List[dict]) -> str:
+        """Fold turns into the running summary, falling back to a truncated transcript"""
+        transcript = "\n".join(f"User: {t['question']}\nAssistant: {t['answer']}" for t in turns)
+        messages = [
+            {
+                "role": "system",
+                "content": "You maintain a running summary of a skincare chat. Reply with the updated summary only."
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"Current summary:\n{summary or '(none)'}\n\n"
+                    f"New exchanges:\n{transcript}\n\n"
+                    f"Update the summary in under {self.summary_max_chars // 6} words. Keep the user's stated "
+                    "preferences, reactions, products and ingredients discussed, and advice already given."
+                )
+            }
+        ]
+        try:
+            updated = await llm_client.complete("chat_summary", messages)
+        except Exception as e:
+            logger.warning(f"Chat summary failed, keeping a truncated transcript: {str(e)}")
+            updated = f"{summary} Earlier questions: {'; '.join(t['question'] for t in turns)}"
+        return _shorten(updated, self.summary_max_chars)
+
+    async def clear(self, email: str, report_id: str) -> None:
+        """Forget a conversation so the next question starts fresh"""
+        try:
+            await self.collection.delete_one({"_id": self._key(email, report_id)})
+        except Exception as e:
+            logger.warning(f"Chat session delete failed: {str(e)}")
+
+
+chat_sessions = ChatSessionStore(
+    chat_cfg["sessions"]["collection"],
+    window_turns=chat_cfg["sessions"]["window_turns"],
+    answer_max_chars=chat_cfg["sessions"]["answer_max_chars"],
+    summary_max_chars=chat_cfg["sessions"]["summary_max_chars"],
+    ttl=timedelta(hours=chat_cfg["sessions"]["ttl_hours"])
+)
@@ -1,19 +1,134 @@
-import os
-from groq import Groq
 import  json
-import yaml
-from pathlib import Path
-
-config_path = Path(__file__).parent.parent / "config" / "config.yaml"
-cfg = yaml.safe_load(config_path.read_text())
-
-def compare_products(analysis1, analysis2, skin_type, concerns):
-    """Compare two product analyses using Groq"""
-    groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    
-    response = groq_client.chat.completions.create(
-        model=cfg["models"]["comparison"]["name"],
-        messages=[
+import logging
+from backend.app.llm_client import llm_client
+from backend.app.cache import normalize_ingredient_name
+from backend.app.ratings import SAFETY_RANK, BARRIER_RANK, ALLERGY_RANK, rank, suitability
+
+logger = logging.getLogger(__name__)
+
+# Per-ingredient fields the comparison needs; long personalized notes are left out
+COMPARISON_INGREDIENT_FIELDS = ("name", "function", "safety", "barrier_impact", "allergy_potential", "special_concerns")
+
+# How many ingredient names to spell out in a key difference
+MAX_LISTED_INGREDIENTS = 5
+
+def condense_analysis(analysis: dict) -> dict:
+    """Strip an analysis down to what matters for a side-by-side comparison"""
+    return {
+        "overall_assessment": {
+            key: value
+            for key, value in analysis.get("overall_assessment", {}).items()
+            if key != "personalized_notes"
+        },
+        "ingredients": [
+            {field: ingredient[field] for field in COMPARISON_INGREDIENT_FIELDS if field in ingredient}
+            for ingredient in analysis.get("ingredients", [])
+        ]
+    }
+
+def _ingredients_by_name(analysis: dict) -> dict:
+    ingredients = {}
+    for ingredient in analysis.get("ingredients", []):
+        name = ingredient.get("name")
+        if name:
+            ingredients.setdefault(normalize_ingredient_name(name), ingredient)
+    return ingredients
+
+def _flagged(ingredients: dict) -> list:
+    """Names of ingredients rated unsafe, barrier-damaging or highly allergenic"""
+    return [
+        ingredient["name"]
+        for ingredient in ingredients.values()
+        if rank(SAFETY_RANK, ingredient.get("safety")) == 0
+        or rank(BARRIER_RANK, ingredient.get("barrier_impact")) == 0
+        or rank(ALLERGY_RANK, ingredient.get("allergy_potential")) == 0
+    ]
+
+def _product_score(overall: dict, flagged: list) -> float:
+    """Composite used to pick the better product; suitability dominates"""
+    return (
+        2 * suitability(overall)
+        + rank(SAFETY_RANK, overall.get("safety_rating"))
+        + rank(BARRIER_RANK, overall.get("barrier_impact"))
+        + rank(ALLERGY_RANK, overall.get("allergy_risk"))
+        - 0.5 * len(flagged)
+    )
+
+def _listed(names: list) -> str:
+    shown = ", ".join(names[:MAX_LISTED_INGREDIENTS])
+    if len(names) > MAX_LISTED_INGREDIENTS:
+        shown += f" and {len(names) - MAX_LISTED_INGREDIENTS} more"
+    return shown
+
+def compare_analyses(analysis1: dict, analysis2: dict, skin_type: str, concerns: list) -> dict:
+    """Diff two analyze_ingredients outputs without calling the LLM"""
+    overall1 = analysis1.get("overall_assessment", {})
+    overall2 = analysis2.get("overall_assessment", {})
+    ingredients1 = _ingredients_by_name(analysis1)
+    ingredients2 = _ingredients_by_name(analysis2)
+
+    shared = [ingredients1[key]["name"] for key in ingredients1 if key in ingredients2]
+    unique1 = [ingredients1[key]["name"] for key in ingredients1 if key not in ingredients2]
+    unique2 = [ingredients2[key]["name"] for key in ingredients2 if key not in ingredients1]
+    flagged1 = _flagged(ingredients1)
+    flagged2 = _flagged(ingredients2)
+
+    # Positive deltas favour product 1
+    safety_delta = rank(SAFETY_RANK, overall1.get("safety_rating")) - rank(SAFETY_RANK, overall2.get("safety_rating"))
+    barrier_delta = rank(BARRIER_RANK, overall1.get("barrier_impact")) - rank(BARRIER_RANK, overall2.get("barrier_impact"))
+    allergy_delta = rank(ALLERGY_RANK, overall1.get("allergy_risk")) - rank(ALLERGY_RANK, overall2.get("allergy_risk"))
+    suitability_difference = suitability(overall1) - suitability(overall2)
+
+    better_product = 1 if _product_score(overall1, flagged1) >= _product_score(overall2, flagged2) else 2
+
+    key_differences = []
+    if suitability_difference:
+        key_differences.append(
+            f"Suitability for {skin_type} skin: {suitability(overall1)}/5 vs {suitability(overall2)}/5"
+        )
+    for label, delta, key in (
+        ("Safety rating", safety_delta, "safety_rating"),
+        ("Barrier impact", barrier_delta, "barrier_impact"),
+        ("Allergy risk", allergy_delta, "allergy_risk")
+    ):
+        if delta:
+            key_differences.append(f"{label}: {overall1.get(key, 'unknown')} vs {overall2.get(key, 'unknown')}")
+    for number, flagged in ((1, flagged1), (2, flagged2)):
+        if flagged:
+            key_differences.append(f"Product {number} has {len(flagged)} flagged ingredient(s): {_listed(flagged)}")
+    for number, unique in ((1, unique1), (2, unique2)):
+        if unique:
+            key_differences.append(f"Only product {number} contains: {_listed(unique)}")
+
+    concerns_str = ", ".join(concerns) if concerns else "no specific concerns"
+    other = 2 if better_product == 1 else 1
+    comparison_summary = (
+        f"For {skin_type} skin with {concerns_str}, product {better_product} is the better match "
+        f"(suitability {suitability(overall1 if better_product == 1 else overall2)}/5 vs "
+        f"{suitability(overall2 if better_product == 1 else overall1)}/5). "
+        f"The products share {len(shared)} ingredient(s); product {other} has "
+        f"{len(flagged2 if better_product == 1 else flagged1)} flagged ingredient(s) against "
+        f"{len(flagged1 if better_product == 1 else flagged2)} for product {better_product}."
+    )
+
+    return {
+        "better_product": better_product,
+        "comparison_summary": comparison_summary,
+        "key_differences": key_differences,
+        "shared_ingredients": shared,
+        "unique_ingredients": {"product1": unique1, "product2": unique2},
+        "flagged_ingredients": {"product1": flagged1, "product2": flagged2},
+        "safety_delta": safety_delta,
+        "barrier_delta": barrier_delta,
+        "allergy_delta": allergy_delta,
+        "suitability_score_difference": suitability_difference
+    }
+
+async def summarize_comparison(comparison: dict, analysis1: dict, analysis2: dict, skin_type: str, concerns: list) -> str:
+    """Ask Groq to write the prose summary for an already computed comparison"""
+    content = await llm_client.complete(
+        "comparison",
+        [
             {
                 "role": "system",
                 "content": "You are a skincare expert comparing two products"
@@ -21,15 +136,35 @@ def compare_products(analysis1, analysis2, skin_type, concerns):
             {
                 "role": "user",
                 "content": (
-                    f"Compare these products for {skin_type} skin with concerns: {', '.join(concerns)}\n\n"
-                    "PRODUCT 1 ANALYSIS:\n" + json.dumps(analysis1) + "\n\n"
-                    "PRODUCT 2 ANALYSIS:\n" + json.dumps(analysis2) + "\n\n"
-                    "Output comparison in JSON format with these keys: "
-                    "better_product (1 or 2), comparison_summary, key_differences"
+                    f"Two products were compared for {skin_type} skin with concerns: {', '.join(concerns)}\n\n"
+                    "PRODUCT 1 ASSESSMENT:\n" + json.dumps(condense_analysis(analysis1)["overall_assessment"]) + "\n\n"
+                    "PRODUCT 2 ASSESSMENT:\n" + json.dumps(condense_analysis(analysis2)["overall_assessment"]) + "\n\n"
+                    "COMPUTED COMPARISON:\n" + json.dumps(comparison) + "\n\n"
+                    "Do not change the verdict. Output JSON with one key: comparison_summary "
+                    "(3-4 sentences explaining the verdict to the user)"
                 )
             }
         ],
         response_format={"type": "json_object"}
     )
-    
-    return json.loads(response.choices[0].message.content)
\ No newline at end of file
+
+    return json.loads(content)["comparison_summary"]
+
+async def compare_products(analysis1, analysis2, skin_type, concerns, llm_summary=False):
+    """Compare two product analyses locally, optionally letting Groq write the summary.
+
+    The LLM call runs on the shared client, so it queues behind the same
+    concurrency cap as every other Groq call and can be cancelled.
+    """
+    comparison = compare_analyses(analysis1, analysis2, skin_type, concerns)
+
+    if llm_summary:
+        try:
+            comparison["comparison_summary"] = await summarize_comparison(
+                comparison, analysis1, analysis2, skin_type, concerns
+            )
+        except Exception as e:
+            # The computed summary is still a valid answer
+            logger.error(f"Comparison summary failed: {str(e)}")
+
+    return comparison
@@ -0,0 +1,5 @@
+import yaml
+from pathlib import Path
+
+config_path = Path(__file__).parent.parent / "config" / "config.yaml"
+cfg = yaml.safe_load(config_path.read_text())
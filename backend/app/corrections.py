@@ -0,0 +1,158 @@
+import re
+import json
+import logging
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CORRECTIONS_PATH = Path(__file__).parent.parent / cfg["ocr"]["corrections_path"]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Compile words into one regex shaped like their prefix trie.
+
+    Shared prefixes are matched once, so the cost at each text position depends
+    on the length of the longest misreading rather than on how many there are.
+    Greedy optional groups make the longest entry win, like Aho-Corasick's
+    leftmost-longest matching, while the scan itself runs inside the regex engine.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of an entry
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            body = (body if len(branches) == 1 and len(body) == 1 else f"(?:{body})") + "?"
+        return body
+
+    return build(trie)
+
+
+class CorrectionIndex:
+    """OCR misreading -> correct spelling dictionary compiled into a single pattern.
+
+    Entries live in a versioned JSON file. Misreadings are matched case-insensitively,
+    either anywhere in a name or only as whole words.
+    """
+
+    def __init__(self, corrections: List[dict], version: int = 0):
+        self.version = version
+        self.corrections: Dict[str, dict] = {}
+        for entry in corrections:
+            self.corrections[entry["misread"].strip().lower()] = {
+                "correction": entry["correction"],
+                "whole_word": bool(entry.get("whole_word", False))
+            }
+        self._compile()
+
+    @classmethod
+    def load(cls, path: Path = CORRECTIONS_PATH) -> "CorrectionIndex":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(data.get("corrections", []), version=data.get("version", 0))
+
+    def _compile(self) -> None:
+        whole_words = [misread for misread, entry in self.corrections.items() if entry["whole_word"]]
+        substrings = [misread for misread, entry in self.corrections.items() if not entry["whole_word"]]
+        alternatives = []
+        if whole_words:
+            alternatives.append(fr"\b{_trie_pattern(whole_words)}\b")
+        if substrings:
+            alternatives.append(_trie_pattern(substrings))
+        self.pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        self.replacements = {misread: entry["correction"] for misread, entry in self.corrections.items()}
+
+    def _replace(self, match: re.Match) -> str:
+        return self.replacements.get(match.group().lower(), match.group())
+
+    def apply(self, text: str) -> str:
+        """Apply every correction in one pass over the text"""
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def add(self, misread: str, correction: str, whole_word: bool = False) -> None:
+        self.corrections[misread.strip().lower()] = {"correction": correction, "whole_word": whole_word}
+        self._compile()
+
+    def remove(self, misread: str) -> bool:
+        removed = self.corrections.pop(misread.strip().lower(), None) is not None
+        if removed:
+            self._compile()
+        return removed
+
+    def save(self, path: Path = CORRECTIONS_PATH) -> None:
+        """Write the dictionary back sorted (substring entries first), one entry per line"""
+        entries = sorted(self.corrections.items(), key=lambda item: (item[1]["whole_word"], item[0]))
+        lines = [
+            "  " + json.dumps({"misread": misread, **entry}, ensure_ascii=False)
+            for misread, entry in entries
+        ]
+        path.write_text(
+            "{\n"
+            f' "version": {self.version},\n'
+            ' "corrections": [\n'
+            + ",\n".join(lines) + "\n"
+            " ]\n"
+            "}\n",
+            encoding="utf-8"
+        )
+
+
+ocr_corrections = CorrectionIndex.load()
+logger.info(f"Loaded {len(ocr_corrections.corrections)} OCR corrections (v{ocr_corrections.version})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the OCR correction dictionary")
+    parser.add_argument("--path", type=Path, default=CORRECTIONS_PATH, help="corrections data file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add or replace a correction")
+    add.add_argument("misread")
+    add.add_argument("correction")
+    add.add_argument("--whole-word", action="store_true", help="only match the misreading as a whole word")
+
+    remove = commands.add_parser("remove", help="remove a correction")
+    remove.add_argument("misread")
+
+    commands.add_parser("rebuild", help="normalize the data file and recompile the index")
+
+    apply = commands.add_parser("apply", help="run the corrections over some text")
+    apply.add_argument("text")
+
+    args = parser.parse_args()
+    index = CorrectionIndex.load(args.path)
+
+    if args.command == "apply":
+        print(index.apply(args.text))
+        return
+
+    if args.command == "add":
+        index.add(args.misread, args.correction, args.whole_word)
+    elif args.command == "remove" and not index.remove(args.misread):
+        parser.exit(1, f"No correction for '{args.misread}'\n")
+
+    # Every write bumps the version so deployed data files can be told apart
+    index.version += 1
+    index.save(args.path)
+    print(
+        f"{len(index.corrections)} corrections, version {index.version}, "
+        f"index pattern {len(index.pattern.pattern) if index.pattern else 0} chars"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,14 @@ class MongoDB:
         self.db = self.client.skincare_db
         print("Connected to MongoDB!")
 
+    def get_db(self):
+        """Return the database handle, connecting on first use"""
+        if self.db is None:
+            self.connect()
+        return self.db
+
     def close(self):
-        self.client.close()
+        if self.client is not None:
+            self.client.close()
 
 mongodb = MongoDB()
\ No newline at end of file
@@ -0,0 +1,212 @@
+import re
+import logging
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from backend.app.cache import normalize_ingredient_name
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INCI_CFG = cfg["inci"]
+INCI_NAMES_PATH = Path(__file__).parent.parent / INCI_CFG["names_path"]
+
+# Shorter tokens have too few trigrams to be matched reliably
+MIN_FUZZY_LENGTH = 4
+
+DIGITS_RE = re.compile(r"\d+")
+WORD_RE = re.compile(r"[a-z]+")
+
+# Character pairs OCR engines commonly confuse; swapping them is cheap, any other
+# edit costs 1, so a real but different ingredient name is never "one misread away"
+OCR_CONFUSIONS = {
+    frozenset(pair) for pair in (
+        ("l", "i"), ("l", "1"), ("i", "1"), ("i", "j"), ("o", "0"), ("s", "5"), ("e", "c"),
+        ("e", "o"), ("a", "o"), ("u", "v"), ("g", "q"), ("g", "9"), ("z", "2"), ("b", "8"), ("t", "f")
+    )
+}
+CONFUSION_COST = 0.25
+# Glyph pairs read as a single character (rn -> m) and the reverse
+OCR_SPLITS = {("rn", "m"), ("cl", "d"), ("vv", "w"), ("ii", "u")}
+SPLIT_COST = 0.5
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _substitution_cost(char_a: str, char_b: str) -> float:
+    if char_a == char_b:
+        return 0.0
+    return CONFUSION_COST if frozenset((char_a, char_b)) in OCR_CONFUSIONS else 1.0
+
+
+def ocr_edit_distance(a: str, b: str, limit: float) -> float:
+    """Levenshtein distance weighted for OCR errors, giving up with limit + 1 once it must exceed limit.
+
+    Substituting commonly confused characters (l/i, o/0, rn/m, ...) costs a
+    fraction of an edit; insertions, deletions and other substitutions cost 1.
+    """
+    if abs(len(a) - len(b)) > 2 * limit + 1:
+        return limit + 1
+    rows = [[float(j) for j in range(len(b) + 1)]]
+    for i in range(1, len(a) + 1):
+        current = [float(i)]
+        for j in range(1, len(b) + 1):
+            best = min(
+                rows[i - 1][j] + 1,
+                current[j - 1] + 1,
+                rows[i - 1][j - 1] + _substitution_cost(a[i - 1], b[j - 1])
+            )
+            if i >= 2 and (a[i - 2:i], b[j - 1]) in OCR_SPLITS:
+                best = min(best, rows[i - 2][j - 1] + SPLIT_COST)
+            if j >= 2 and (b[j - 2:j], a[i - 1]) in OCR_SPLITS:
+                best = min(best, rows[i - 1][j - 2] + SPLIT_COST)
+            current.append(best)
+        # Glyph splits reach back two rows, so both must be past the limit
+        if min(current) > limit and min(rows[i - 1]) > limit:
+            return limit + 1
+        rows.append(current)
+    return rows[-1][-1]
+
+
+class InciResolver:
+    """Maps ingredient spellings to canonical INCI names.
+
+    Exact matches and aliases (after normalization) are a dictionary lookup and
+    are safe for any input. Fuzzy matching is meant for OCR output only: a
+    trigram inverted index narrows the list to the names sharing the most
+    trigrams with the token, and OCR-weighted edit distance picks among those.
+    A fuzzy match must be within ``max_distance``, reach ``min_confidence``
+    (1 - distance / length of the longer name) and beat the runner-up by
+    ``min_margin``; tokens made only of words the list already knows, or whose
+    numbers differ from the candidate's, are never rewritten.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        min_confidence: float,
+        max_candidates: int,
+        cache_size: int,
+        max_distance: float = 1.0,
+        min_margin: float = 1.0
+    ):
+        self.min_confidence = min_confidence
+        self.max_candidates = max_candidates
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        self.words = set()
+        self._exact = {}
+        self._index = defaultdict(list)
+
+        aliases = {}
+        for name in names:
+            # "Alias => Canonical" lines map alternative INCI names onto one spelling
+            if "=>" in name:
+                alias, canonical = (part.strip() for part in name.split("=>", 1))
+                aliases[normalize_ingredient_name(alias)] = normalize_ingredient_name(canonical)
+                self.words.update(WORD_RE.findall(normalize_ingredient_name(alias)))
+                continue
+            key = normalize_ingredient_name(name)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = len(self.names)
+            self.words.update(WORD_RE.findall(key))
+            for gram in trigrams(key):
+                self._index[gram].append(len(self.names))
+            self.names.append(name)
+            self.keys.append(key)
+
+        for alias, canonical in aliases.items():
+            if canonical in self._exact:
+                self._exact.setdefault(alias, self._exact[canonical])
+
+        self._nearest = lru_cache(maxsize=cache_size)(self._nearest_uncached)
+
+    @classmethod
+    def load(cls, path: Path = INCI_NAMES_PATH) -> "InciResolver":
+        lines = path.read_text(encoding="utf-8").splitlines()
+        names = [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+        resolver = cls(
+            names,
+            min_confidence=INCI_CFG["min_confidence"],
+            max_candidates=INCI_CFG["max_candidates"],
+            cache_size=INCI_CFG["cache_size"],
+            max_distance=INCI_CFG["max_distance"],
+            min_margin=INCI_CFG["min_margin"]
+        )
+        logger.info(f"Loaded {len(resolver.names)} INCI names")
+        return resolver
+
+    def is_plausible(self, key: str) -> bool:
+        """Whether every word of a normalized token is a word the name list uses"""
+        words = WORD_RE.findall(key)
+        return bool(words) and all(word in self.words for word in words)
+
+    def _nearest_uncached(self, key: str) -> Tuple[Optional[str], float]:
+        shared = Counter()
+        for gram in trigrams(key):
+            shared.update(self._index.get(gram, ()))
+        if not shared:
+            return None, 0.0
+
+        # Numbers must agree exactly: PEG-40 is not PEG-100, and "Ceteareth-" with
+        # its number lost could be any of several real ingredients
+        digits = DIGITS_RE.findall(key)
+        best, best_distance, runner_up = None, None, None
+        limit = self.max_distance + self.min_margin
+        for candidate, _ in shared.most_common(self.max_candidates):
+            candidate_key = self.keys[candidate]
+            if DIGITS_RE.findall(candidate_key) != digits:
+                continue
+            distance = ocr_edit_distance(key, candidate_key, limit)
+            if distance > limit:
+                continue
+            if best_distance is None or distance < best_distance:
+                best, best_distance, runner_up = candidate, distance, best_distance
+            elif runner_up is None or distance < runner_up:
+                runner_up = distance
+
+        if best is None or best_distance > self.max_distance:
+            return None, 0.0
+        # A close second candidate means the token is ambiguous, not misread
+        if runner_up is not None and runner_up - best_distance < self.min_margin:
+            return None, 0.0
+        return self.names[best], 1 - best_distance / max(len(key), len(self.keys[best]))
+
+    def resolve(self, token: str, fuzzy: bool = True) -> Tuple[Optional[str], float]:
+        """Return the canonical name and its confidence, or (None, 0.0).
+
+        Only exact and alias matches score 1.0; with ``fuzzy`` an OCR misreading
+        may resolve with a lower confidence.
+        """
+        key = normalize_ingredient_name(token)
+        if key in self._exact:
+            return self.names[self._exact[key]], 1.0
+        # A name spelled with known words may be a real ingredient missing from the list
+        if not fuzzy or len(key) < MIN_FUZZY_LENGTH or self.is_plausible(key):
+            return None, 0.0
+        return self._nearest(key)
+
+    def canonical_name(self, token: str, fuzzy: bool = False) -> str:
+        """Canonical spelling of token when confidently resolved, otherwise token unchanged"""
+        name, confidence = self.resolve(token, fuzzy)
+        if name is None or confidence < self.min_confidence:
+            return token
+        if confidence < 1.0:
+            logger.info(f"Resolved '{token}' to '{name}' ({confidence:.2f})")
+        return name
+
+    def canonicalize(self, tokens: Iterable[str], fuzzy: bool = False) -> List[str]:
+        """Canonical spellings; ``fuzzy`` also corrects misreadings and is meant for OCR output"""
+        return [self.canonical_name(token, fuzzy) for token in tokens]
+
+
+inci_resolver = InciResolver.load()
@@ -0,0 +1,98 @@
+import csv
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+from backend.app.cache import normalize_ingredient_name
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_BASE_PATH = Path(__file__).parent.parent / cfg["knowledge_base"]["path"]
+
+# Ratings at or above this are reported as pore-clogging
+COMEDOGENIC_THRESHOLD = 3
+
+# special_concerns text for each risk flag in the knowledge base
+FLAG_CONCERNS = {
+    "fragrance": "Fragrance is a leading cause of cosmetic skin reactions",
+    "fragrance_allergen": "Declared fragrance allergen",
+    "essential_oil": "Essential oil; can irritate and sensitize skin",
+    "drying_alcohol": "Drying alcohol that can weaken the skin barrier",
+    "sulfate": "Sulfate surfactant that can strip natural oils",
+    "exfoliant": "Exfoliating acid; can irritate when overused",
+    "retinoid": "Retinoid; can cause dryness and irritation, avoid during pregnancy",
+    "photosensitizing": "Increases sun sensitivity; use sunscreen",
+    "formaldehyde_releaser": "Formaldehyde-releasing preservative",
+    "isothiazolinone": "Preservative with high contact-allergy rates",
+    "paraben": "Paraben preservative"
+}
+
+
+def _tags(value: str) -> frozenset:
+    return frozenset(tag.strip() for tag in (value or "").split(";") if tag.strip())
+
+
+class IngredientKnowledgeBase:
+    """Static per-ingredient facts bundled with the backend.
+
+    Covers what does not depend on the user (function, comedogenicity, safety,
+    barrier impact, allergy potential and risk flags) so only personalized notes
+    need the LLM. Rows are keyed by normalized INCI name.
+    """
+
+    def __init__(self, rows):
+        self._entries: Dict[str, dict] = {}
+        for row in rows:
+            self._entries[normalize_ingredient_name(row["name"])] = {
+                "name": row["name"],
+                "function": row["function"],
+                "comedogenic_rating": int(row["comedogenic"] or 0),
+                "safety": row["safety"],
+                "barrier_impact": row["barrier_impact"],
+                "allergy_potential": row["allergy_potential"],
+                "flags": _tags(row["flags"]),
+                "good_for": _tags(row["good_for"]),
+                "avoid_for": _tags(row["avoid_for"])
+            }
+
+    @classmethod
+    def load(cls, path: Path = KNOWLEDGE_BASE_PATH) -> "IngredientKnowledgeBase":
+        with open(path, newline="", encoding="utf-8") as f:
+            knowledge_base = cls(csv.DictReader(f))
+        logger.info(f"Loaded {len(knowledge_base)} ingredients into the knowledge base")
+        return knowledge_base
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_ingredient_name(name) in self._entries
+
+    def get(self, name: str) -> Optional[dict]:
+        """Raw entry including flags and skin-profile tags"""
+        return self._entries.get(normalize_ingredient_name(name))
+
+    def facts(self, name: str) -> Optional[dict]:
+        """Report record with the static fields filled in, or None for unknown ingredients"""
+        entry = self.get(name)
+        if entry is None:
+            return None
+
+        special_concerns = [FLAG_CONCERNS[flag] for flag in sorted(entry["flags"]) if flag in FLAG_CONCERNS]
+        if entry["comedogenic_rating"] >= COMEDOGENIC_THRESHOLD:
+            special_concerns.append(f"Comedogenic (rated {entry['comedogenic_rating']}/5)")
+
+        return {
+            "name": name,
+            "function": entry["function"],
+            "safety": entry["safety"],
+            "barrier_impact": entry["barrier_impact"],
+            "allergy_potential": entry["allergy_potential"],
+            "comedogenic_rating": entry["comedogenic_rating"],
+            "special_concerns": special_concerns
+        }
+
+
+ingredient_kb = IngredientKnowledgeBase.load()
@@ -0,0 +1,126 @@
+import os
+import json
+import asyncio
+import logging
+import aiohttp
+from typing import AsyncIterator, Optional
+from dotenv import load_dotenv
+from backend.app.config import cfg
+
+# Load environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
+load_dotenv(dotenv_path)
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LLMAPIError(RuntimeError):
+    """Raised when the Groq API answers with a non-200 status"""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"Groq API error: {status} - {body}")
+        self.status = status
+        self.body = body
+
+
+class LLMClient:
+    """App-lifetime Groq client sharing one pooled keep-alive session.
+
+    aiohttp speaks HTTP/1.1 only, so connection reuse comes from keep-alive on a
+    bounded pool rather than HTTP/2 multiplexing.
+    """
+
+    def __init__(self, api_cfg: dict, models_cfg: dict):
+        self.url = api_cfg["url"]
+        self.api_key = os.getenv(api_cfg["key_env"])
+        self.pool_size = api_cfg["pool_size"]
+        self.keepalive_timeout = api_cfg["keepalive_timeout"]
+        self.models = models_cfg
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Caps in-flight completions across all callers; extra requests queue here
+        self._semaphore = asyncio.Semaphore(api_cfg["max_concurrency"])
+
+    async def start(self) -> None:
+        """Open the shared session (called from the FastAPI lifespan)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+        )
+        logger.info("LLM client session started")
+
+    async def close(self) -> None:
+        """Close the shared session (called on app shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def build_payload(self, model_key: str, messages: list, **overrides) -> dict:
+        """Build a chat completion payload from the model's config section"""
+        model_cfg = self.models[model_key]
+        payload = {"model": model_cfg["name"], "messages": messages}
+        for option in ("temperature", "max_tokens"):
+            if option in model_cfg:
+                payload[option] = model_cfg[option]
+        payload.update(overrides)
+        return payload
+
+    async def chat_completion(self, model_key: str, messages: list, **overrides) -> dict:
+        """Send a chat completion for a configured model and return the decoded response"""
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        payload = self.build_payload(model_key, messages, **overrides)
+        timeout = aiohttp.ClientTimeout(total=self.models[model_key].get("timeout"))
+
+        async with self._semaphore:
+            async with self._session.post(self.url, json=payload, timeout=timeout) as response:
+                if response.status != 200:
+                    raise LLMAPIError(response.status, await response.text())
+                return await response.json()
+
+    async def complete(self, model_key: str, messages: list, **overrides) -> str:
+        """Return only the message content of a chat completion"""
+        data = await self.chat_completion(model_key, messages, **overrides)
+        return data["choices"][0]["message"]["content"]
+
+    async def stream(self, model_key: str, messages: list, **overrides) -> AsyncIterator[str]:
+        """Yield content deltas of a streamed chat completion as they arrive"""
+        if self._session is None or self._session.closed:
+            await self.start()
+
+        payload = self.build_payload(model_key, messages, stream=True, **overrides)
+        # Bound the gap between chunks rather than the whole generation
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.models[model_key].get("timeout"))
+
+        async with self._semaphore:
+            async with self._session.post(self.url, json=payload, timeout=timeout) as response:
+                if response.status != 200:
+                    raise LLMAPIError(response.status, await response.text())
+
+                # OpenAI-compatible server-sent events: "data: {...}" lines, then "data: [DONE]"
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+
+llm_client = LLMClient(cfg["api"]["groq"], cfg["models"])
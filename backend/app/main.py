@@ -1,13 +1,18 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 import logging
 from backend.app.ocr import extract_ingredients
-from backend.app.analysis import analyze_ingredients
-from backend.app.chat import get_chat_response
+from backend.app.analysis import analyze_ingredients, provisional_analysis, stream_analysis
+from backend.app.streaming import sse_event
+from backend.app.chat import get_chat_response, stream_chat_response, is_failed_answer, CHAT_SOURCES
+from backend.app.answer_cache import chat_answer_cache
+from backend.app.chat_sessions import chat_sessions
+from backend.app.chat_context import build_chat_context, is_current as is_current_chat_context
 import uvicorn
 from motor.motor_asyncio import AsyncIOMotorClient
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from backend.app.routine import generate_routine_with_groq
@@ -20,7 +25,16 @@ from fastapi import BackgroundTasks
 from dotenv import load_dotenv
 from typing import Optional, List
 import asyncio
+from contextlib import asynccontextmanager
 from backend.app.web_scraper import get_ingredients_by_product_name
+from backend.app.web_scraper import close_session as close_scraper_session
+from backend.app.llm_client import llm_client
+from backend.app.ocr_providers import ocr_service
+from backend.app.cache import ocr_text_cache
+from backend.app.workers import run_cpu
+from backend.app.workers import shutdown as shutdown_cpu_pool
+from backend.app import auth
+from backend.app.uploads import UploadSizeLimitMiddleware, is_upload_too_large, upload_store, MAX_UPLOAD_BYTES
 from backend.app.email import send_welcome_email, send_routine_email
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -39,16 +53,36 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your_very_strong_secret_key_here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# How often long-running LLM endpoints check whether the client went away
+DISCONNECT_POLL_SECONDS = 0.5
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open and close app-lifetime resources"""
+    await llm_client.start()
+    await ocr_service.start()
+    yield
+    logger.info(f"OCR cache stats: {ocr_text_cache.stats()}")
+    await ocr_service.close()
+    await llm_client.close()
+    shutdown_cpu_pool()
+    await close_scraper_session()
+
 app = FastAPI(
     title="Personalized Skincare Analyzer",
     description="API for skincare analysis with MongoDB persistence",
     version="2.3.0",
     docs_url="/docs",
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
+)
+
+# Upload size limit (registered first so CORS headers still wrap its 413s)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/analyze-product", "/analyze-product-stream", "/analyze-product-agent", "/uploads"]
 )
 
 # CORS configuration
@@ -106,16 +140,17 @@ class RoutineStep(BaseModel):
     rating: str
     reviews: str
 # Helper functions
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    # bcrypt is deliberately slow; hash on the CPU pool
+    return await run_cpu(auth.get_password_hash, password)
 class RoutineDocument(BaseModel):
     time_of_day: str
     routine: List[RoutineStep]  
     skin_type: str
     concerns: List[str]
     created_at: datetime = datetime.utcnow()
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_cpu(auth.verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -137,11 +172,32 @@ def send_email_with_routine(to_email: str, time_of_day: str, routine: list, skin
         concerns=concerns,
         routine_data=routine_data
     )
-async def get_user(email: str) -> Optional[dict]:
-    return await db.users.find_one({"email": email})
+async def run_until_disconnect(request: Request, coro):
+    """Await coro, cancelling it if the client disconnects first"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling {request.url.path}")
+                task.cancel()
+                raise HTTPException(
+                    status_code=499,
+                    detail="Client closed request"
+                )
+    finally:
+        task.cancel()
+
+# Report fields are large and only read by the endpoints that need them
+REPORT_FIELDS = {"last_report": 0, "last_chat_context": 0}
+
+async def get_user(email: str, projection: Optional[dict] = None) -> Optional[dict]:
+    return await db.users.find_one({"email": email}, projection)
 
 async def create_user(user: UserCreate) -> str:
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     user_data = {
         "email": user.email,
         "skin_type": user.skin_type,
@@ -153,15 +209,36 @@ async def create_user(user: UserCreate) -> str:
     return str(result.inserted_id)
 
 async def save_report(email: str, report: dict) -> None:
+    context = build_chat_context(report.get("analysis", {}))
     await db.users.update_one(
         {"email": email},
-        {"$set": {"last_report": report}}
+        {"$set": {
+            "last_report": report,
+            "last_chat_context": context
+        }}
     )
+    # Re-analyzing a product yields the same fingerprint; the frontend starts an empty
+    # transcript for every new report, so the server must not resume an older conversation
+    await chat_sessions.clear(email, context["fingerprint"])
 
 async def get_report(email: str) -> Optional[dict]:
-    user = await get_user(email)
+    user = await get_user(email, {"last_report": 1})
     return user.get("last_report") if user else None
 
+async def get_chat_context(email: str) -> Optional[dict]:
+    """Compact chat context of the user's last report, built from the report if missing or outdated"""
+    user = await get_user(email, {"last_chat_context": 1})
+    context = user.get("last_chat_context") if user else None
+    if is_current_chat_context(context):
+        return context
+
+    report = await get_report(email)
+    if not report:
+        return None
+    context = build_chat_context(report.get("analysis", {}))
+    await db.users.update_one({"email": email}, {"$set": {"last_chat_context": context}})
+    return context
+
 # Authentication functions
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     credentials_exception = HTTPException(
@@ -189,7 +266,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         logger.error(f"JWT validation failed: {str(e)}")
         raise credentials_exception
     
-    user = await get_user(email)
+    user = await get_user(email, REPORT_FIELDS)
     if user is None:
         raise credentials_exception
     return user
@@ -225,7 +302,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
             detail="Invalid credentials"
         )
 
-    if not verify_password(form_data.password, user["hashed_password"]):
+    if not await verify_password(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -282,8 +359,14 @@ async def analyze_product_from_image(
 ) -> dict:
     """Extract ingredients from image and analyze them"""
     try:
-        contents = await image.read()
-        ingredients = await extract_ingredients(contents)
+        if is_upload_too_large(image):
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+            )
+
+        # Decode straight from the spooled upload instead of copying it into memory
+        ingredients = await extract_ingredients(image.file)
         logger.info(f"Extracted ingredients: {ingredients}")
         
         # Handle empty ingredients case
@@ -317,26 +400,110 @@ async def analyze_product_from_image(
             detail="Could not analyze product from image"
         )
     
+@app.post("/analyze-product-stream")
+async def analyze_product_stream(
+    image: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+) -> StreamingResponse:
+    """Like /analyze-product, but streams the report as server-sent events.
+
+    Events: extracted_ingredients, provisional (local score), ingredient (one per
+    record as the model completes it), overall_assessment, then complete with the
+    saved report, or error.
+    """
+    if is_upload_too_large(image):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+        )
+
+    # OCR runs before the stream opens so failures keep their HTTP status codes
+    try:
+        ingredients = await extract_ingredients(image.file)
+    except Exception as e:
+        logger.error(f"Product analysis failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not analyze product from image"
+        )
+    if not ingredients or ingredients.strip() == "":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ingredients found in image"
+        )
+
+    async def events():
+        yield sse_event("extracted_ingredients", ingredients)
+        try:
+            async for event, data in stream_analysis(
+                ingredients,
+                skin_type=current_user["skin_type"],
+                concerns=current_user["concerns"]
+            ):
+                if event == "complete":
+                    report = {"extracted_ingredients": ingredients, "analysis": data}
+                    await save_report(current_user["email"], report)
+                    data = report
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Streamed product analysis failed: {str(e)}")
+            yield sse_event("error", {"detail": "Could not analyze product from image"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/chat", response_model=dict)
 async def chat_about_product(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ) -> dict:
     """Get responses to skincare questions"""
     try:
-        report = await get_report(current_user["email"])
-        if not report:
+        context = await get_chat_context(current_user["email"])
+        if not context:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No analysis available"
             )
         
-        return await get_chat_response(
-            request.question,
-            report["analysis"],
-            skin_type=current_user["skin_type"],
-            concerns=current_user["concerns"]
-        )
+        history = await chat_sessions.get(current_user["email"], context["fingerprint"])
+        # Only questions asked without prior turns are independent of the conversation
+        cacheable = not history["turns"]
+        result = None
+        if cacheable:
+            result = await chat_answer_cache.get(
+                request.question, context["fingerprint"], current_user["skin_type"], current_user["concerns"]
+            )
+        if result is None:
+            result = await get_chat_response(
+                request.question,
+                context,
+                skin_type=current_user["skin_type"],
+                concerns=current_user["concerns"],
+                history=history
+            )
+            if cacheable and not is_failed_answer(result["response"]):
+                background_tasks.add_task(
+                    chat_answer_cache.put,
+                    request.question,
+                    context["fingerprint"],
+                    current_user["skin_type"],
+                    current_user["concerns"],
+                    result
+                )
+        if not is_failed_answer(result["response"]):
+            background_tasks.add_task(
+                chat_sessions.append,
+                current_user["email"],
+                context["fingerprint"],
+                request.question,
+                result["response"]
+            )
+        return result
     except Exception as e:
         logger.error(f"Chat failed: {str(e)}")
         raise HTTPException(
@@ -344,6 +511,76 @@ async def chat_about_product(
             detail="Chat service unavailable"
         )
 
+@app.post("/chat-stream")
+async def chat_about_product_stream(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the answer to a skincare question as plain text chunks"""
+    context = await get_chat_context(current_user["email"])
+    if not context:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No analysis available"
+        )
+
+    email = current_user["email"]
+    history = await chat_sessions.get(email, context["fingerprint"])
+    cacheable = not history["turns"]
+    cached = None
+    if cacheable:
+        cached = await chat_answer_cache.get(
+            request.question, context["fingerprint"], current_user["skin_type"], current_user["concerns"]
+        )
+    parts = []
+
+    async def relay():
+        if cached is not None:
+            parts.append(cached["response"])
+            yield cached["response"]
+            return
+        async for delta in stream_chat_response(
+            request.question,
+            context,
+            skin_type=current_user["skin_type"],
+            concerns=current_user["concerns"],
+            history=history
+        ):
+            parts.append(delta)
+            yield delta
+
+    async def remember():
+        # Runs once the whole answer has been sent
+        answer = "".join(parts)
+        if not answer or is_failed_answer(answer):
+            return
+        await chat_sessions.append(email, context["fingerprint"], request.question, answer)
+        if cacheable and cached is None:
+            await chat_answer_cache.put(
+                request.question,
+                context["fingerprint"],
+                current_user["skin_type"],
+                current_user["concerns"],
+                {"response": answer, "sources": CHAT_SOURCES}
+            )
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(remember)
+    )
+
+@app.delete("/chat-session", response_model=dict)
+async def clear_chat_session(
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """Start a fresh conversation about the current report"""
+    context = await get_chat_context(current_user["email"])
+    if context:
+        await chat_sessions.clear(current_user["email"], context["fingerprint"])
+    return {"message": "Conversation cleared"}
+
 @app.get("/report", response_model=dict)
 async def get_report_endpoint(
     current_user: dict = Depends(get_current_user)
@@ -453,7 +690,7 @@ async def analyze_product_by_name(
         logger.info(f"Searching for product: {product_name}")
         
         # Get ingredients from web
-        ingredients, source_url = get_ingredients_by_product_name(product_name)
+        ingredients, source_url = await get_ingredients_by_product_name(product_name)
         
         if not ingredients:
             raise HTTPException(
@@ -489,33 +726,101 @@ async def analyze_product_by_name(
             detail="Could not analyze product by name"
         )
 
+@app.post("/score-ingredients", response_model=dict)
+async def score_ingredients_endpoint(
+    request: dict,  # Expecting {"ingredients": "..."}
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """Instant provisional assessment from bundled ingredient data, without the LLM"""
+    ingredients = request.get("ingredients")
+    if not ingredients:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ingredients are required"
+        )
+
+    return provisional_analysis(
+        ingredients,
+        skin_type=current_user["skin_type"],
+        concerns=current_user["concerns"]
+    )
+
+@app.post("/uploads", response_model=dict)
+async def upload_image(
+    image: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+) -> dict:
+    """Store an image for later requests that reference it by upload_id"""
+    if is_upload_too_large(image):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+        )
+    upload_id = await asyncio.to_thread(upload_store.save, current_user["email"], image.file)
+    return {"upload_id": upload_id}
+
 @app.post("/analyze-product-agent", response_model=dict)
 async def analyze_product_agent(
-    request: dict,  # {"input_type": "image/text", "input_data": "..."}
+    input_type: str = Form(...),  # "image" or "text"
+    input_data: Optional[str] = Form(None),  # product name or ingredients for text input
+    image: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),  # ID returned by /uploads, instead of image
     current_user: dict = Depends(get_current_user)
 ) -> dict:
-    """Agent-based product analysis endpoint"""
+    """Agent-based product analysis endpoint (multipart form)"""
     agent = SkincareAgent({
         "skin_type": current_user["skin_type"],
         "concerns": current_user["concerns"]
     })
-    return await agent.process_input(
-        request["input_type"],
-        request["input_data"]
-    )
+
+    if input_type != "image":
+        if not input_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="input_data is required for text input"
+            )
+        return await agent.process_input(input_type, input_data)
+
+    if image is not None:
+        if is_upload_too_large(image):
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"
+            )
+        return await agent.process_input("image", image.file)
+
+    stored = upload_store.open(current_user["email"], upload_id) if upload_id else None
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="An image file or a valid upload_id is required for image input"
+        )
+    with stored:
+        return await agent.process_input("image", stored)
 
 @app.post("/compare-products", response_model=dict)
 async def compare_products_endpoint(
     products: dict,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ) -> dict:
-    """Compare two analyzed products"""
-    return compare_products(
-        products["product1"],
-        products["product2"],
-        current_user["skin_type"],
-        current_user["concerns"]
-    )
+    """Compare two analyzed products (set "llm_summary": true for an LLM-written summary)"""
+    try:
+        return await run_until_disconnect(request, compare_products(
+            products["product1"],
+            products["product2"],
+            current_user["skin_type"],
+            current_user["concerns"],
+            llm_summary=bool(products.get("llm_summary", False))
+        ))
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Product comparison failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not compare products"
+        )
 async def startup_event() -> None:
     """Initialize database on startup"""
     try:
@@ -1,11 +1,17 @@
 import os
 import re
+import time
 import logging
-import aiohttp
-import base64
 from dotenv import load_dotenv
 from PIL import Image, ImageEnhance
 import io
+from typing import BinaryIO, Union
+from backend.app.ocr_providers import ocr_service
+from backend.app.cache import ocr_text_cache
+from backend.app.corrections import ocr_corrections
+from backend.app.inci import inci_resolver
+from backend.app.config import cfg
+from backend.app.workers import run_cpu, is_process_pool
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -15,98 +21,124 @@ load_dotenv(dotenv_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-OCR_API_KEY = os.getenv("OCR_SPACE_API_KEY")
-OCR_URL = "https://api.ocr.space/parse/image"
+# Raw image bytes or a seekable binary file (e.g. UploadFile.file)
+ImageSource = Union[bytes, BinaryIO]
 
+OCR_HASH_SIZE = cfg["cache"]["ocr"]["hash_size"]
+OCR_MAX_SIDE = cfg["ocr"]["preprocess"]["max_side"]
+OCR_PASSTHROUGH_MAX_BYTES = cfg["ocr"]["preprocess"]["passthrough_max_bytes"]
 
-async def extract_raw_text_from_image(image_bytes: bytes) -> str:
+async def ocr_image_text(image: ImageSource) -> str:
+    """Optimize an image and OCR it, reusing text from identical or near-identical photos"""
+    optimized_image = await optimize_image(image)
+
+    try:
+        image_hash = await run_cpu(image_dhash, optimized_image)
+    except Exception as e:
+        logger.warning(f"Image hashing failed: {str(e)}")
+        image_hash = None
+
+    if image_hash is not None:
+        cached_text = ocr_text_cache.get(image_hash)
+        if cached_text is not None:
+            logger.info(f"OCR cache hit: {ocr_text_cache.stats()}")
+            return cached_text
+
+    text = await ocr_service.extract_text(optimized_image)
+    if image_hash is not None:
+        ocr_text_cache.put(image_hash, text)
+    return text
+
+async def extract_raw_text_from_image(image: ImageSource) -> str:
     """Extract raw text from image without processing"""
     try:
-        if not OCR_API_KEY:
-            logger.error("OCR_SPACE_API_KEY environment variable not set")
-            raise RuntimeError("OCR API key missing")
-            
-        # Optimize image for better OCR results
-        optimized_image = await optimize_image(image_bytes)
-        base64_image = base64.b64encode(optimized_image).decode("utf-8")
-        
-        # Prepare OCR request
-        payload = {
-            "base64Image": f"data:image/jpeg;base64,{base64_image}",
-            "language": "eng",
-            "isOverlayRequired": False,
-            "filetype": "JPG",
-            "OCREngine": 2,
-            "scale": True,
-            "detectOrientation": True
-        }
-        
-        headers = {"apikey": OCR_API_KEY}
-        
-        # Send to OCR API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(OCR_URL, data=payload, headers=headers) as response:
-                result = await response.json()
-                
-                if response.status != 200 or result.get("IsErroredOnProcessing", True):
-                    error = result.get("ErrorMessage", "Unknown OCR error")
-                    logger.error(f"OCR error: {error}")
-                    raise RuntimeError("OCR processing failed")
-                
-                # Return raw text without any processing
-                return result["ParsedResults"][0]["ParsedText"]
+        # Return raw text without any processing
+        return await ocr_image_text(image)
                 
     except Exception as e:
         logger.error(f"Raw text extraction failed: {str(e)}")
         raise RuntimeError("Failed to extract raw text from image")
 
-async def extract_ingredients(image_bytes: bytes) -> str:
-    """Extract ingredients from product image using OCR"""
+async def extract_ingredients(image: ImageSource) -> str:
+    """Extract ingredients from product image (bytes or a file object) using OCR"""
     try:
-        if not OCR_API_KEY:
-            logger.error("OCR_SPACE_API_KEY environment variable not set")
-            raise RuntimeError("OCR API key missing")
-        # Optimize and process image
-        optimized_image = await optimize_image(image_bytes)
-        base64_image = base64.b64encode(optimized_image).decode("utf-8")
-        
-        # Prepare OCR request
-        payload = {
-            "base64Image": f"data:image/jpeg;base64,{base64_image}",
-            "language": "eng",
-            "isOverlayRequired": False,
-            "filetype": "JPG",
-            "OCREngine": 2,
-            "scale": True,
-            "detectOrientation": True
-        }
-        
-        headers = {
-            "apikey": OCR_API_KEY,
-        }
-        
-        # Send to OCR API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(OCR_URL, data=payload, headers=headers) as response:
-                result = await response.json()
-                
-                if response.status != 200 or result.get("IsErroredOnProcessing", True):
-                    error = result.get("ErrorMessage", "Unknown OCR error")
-                    logger.error(f"OCR error: {error}")
-                    raise RuntimeError("OCR processing failed")
-                
-                full_text = result["ParsedResults"][0]["ParsedText"]
-                return process_ingredients_text(full_text)
+        full_text = await ocr_image_text(image)
+        ingredients = process_ingredients_text(full_text)
+
+        # Snap misread names to their canonical INCI spelling
+        return ", ".join(inci_resolver.canonicalize(ingredients.split(", "), fuzzy=True)) if ingredients else ""
                 
     except Exception as e:
         logger.error(f"Processing failed: {str(e)}")
         raise RuntimeError("Failed to extract ingredients")
 
-async def optimize_image(image_bytes: bytes) -> bytes:
-    """Optimize image for better OCR results"""
+def image_dhash(image_bytes: bytes, hash_size: int = OCR_HASH_SIZE) -> int:
+    """Difference hash: compares each pixel with its right neighbour on a tiny grayscale thumbnail"""
+    image = Image.open(io.BytesIO(image_bytes)).convert("L")
+    image = image.resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(image.getdata())
+
+    image_hash = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            image_hash = (image_hash << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return image_hash
+
+async def optimize_image(image: ImageSource) -> bytes:
+    """Optimize image for better OCR results on the CPU worker pool"""
+    if is_process_pool() and not isinstance(image, (bytes, bytearray)):
+        # File objects can't cross the process boundary
+        image.seek(0)
+        image = image.read()
+    return await run_cpu(optimize_image_sync, image)
+
+def _read_source(source: ImageSource) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+def optimize_image_sync(source: ImageSource) -> bytes:
+    """Optimize image for better OCR results.
+
+    Accepts raw bytes or a seekable file object (e.g. a spooled upload), which
+    Pillow decodes from directly without an extra in-memory copy.
+    """
+    started = time.perf_counter()
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        max_size = (1600, 1600)
+        if isinstance(source, (bytes, bytearray)):
+            image_file = io.BytesIO(source)
+            source_size = len(source)
+        else:
+            source.seek(0, 2)
+            source_size = source.tell()
+            source.seek(0)
+            image_file = source
+        image = Image.open(image_file)
+        max_size = (OCR_MAX_SIDE, OCR_MAX_SIDE)
+        native_size, native_mode = image.size, image.mode
+
+        # Already a small grayscale JPEG within bounds: nothing to gain from re-encoding
+        if (
+            image.format == "JPEG"
+            and image.mode == "L"
+            and max(image.size) <= OCR_MAX_SIDE
+            and source_size <= OCR_PASSTHROUGH_MAX_BYTES
+        ):
+            logger.info(f"Image optimization skipped for {native_size[0]}x{native_size[1]} grayscale JPEG")
+            return _read_source(source)
+
+        # Let libjpeg decode straight to grayscale at 1/2, 1/4 or 1/8 scale
+        # instead of materializing the full-resolution RGB bitmap
+        if image.format == "JPEG":
+            scale = OCR_MAX_SIDE / max(native_size)
+            if scale < 1:
+                image.draft("L", (int(native_size[0] * scale), int(native_size[1] * scale)))
+            else:
+                image.draft("L", native_size)
+        decoded_size = image.size
+
         image.thumbnail(max_size, Image.Resampling.LANCZOS)
         
         if image.mode != "L":
@@ -121,58 +153,78 @@ async def optimize_image(image_bytes: bytes) -> bytes:
         
         output_buffer = io.BytesIO()
         image.save(output_buffer, format="JPEG", quality=90)
+
+        native_bytes = native_size[0] * native_size[1] * Image.getmodebands(native_mode)
+        decoded_bytes = decoded_size[0] * decoded_size[1]
+        logger.info(
+            f"Optimized {native_size[0]}x{native_size[1]} {native_mode} image in "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms: decoded at "
+            f"{decoded_size[0]}x{decoded_size[1]}, {(native_bytes - decoded_bytes) / 1e6:.1f} MB "
+            f"of bitmap memory saved ({native_bytes / max(decoded_bytes, 1):.0f}x fewer decoded pixels/bands)"
+        )
         return output_buffer.getvalue()
     except Exception as e:
         logger.warning(f"Image optimization failed: {str(e)}")
-        return image_bytes
+        return _read_source(source)
+
+# --- Ingredient text cleaning -------------------------------------------------
+# Every pattern is compiled once at import; each line and each ingredient name
+# goes through a single combined regex per step instead of a loop of re.sub calls.
+
+# Common ingredient section headers, in priority order
+SECTION_HEADER_PATTERNS = [
+    re.compile(fr"{header}[:\s]*(.*?)(?:\n\n|$)", re.IGNORECASE | re.DOTALL)
+    for header in (
+        "ingredients", "ingrédients", "ingredientes", "成分",
+        "contains", "composants", "active ingredients"
+    )
+]
+
+# Anything that indicates the end of the ingredients section
+END_MARKER_RE = re.compile(
+    r"\n\s*\n"       # Blank line
+    r"| {2,}"         # Excessive spaces
+    r"|(?i:\b(?:distribut|product of|made in|www\.|http|Ml|Floz|g|oz)\b)"  # Common end markers
+)
+
+# Parentheses and numbers/percentages are dropped, bullet points become separators
+BULLETS = frozenset("•*▪➢–—")
+LINE_NOISE_RE = re.compile(r"\([^)]*\)|\d+%?|[•\*▪➢–—]")
+
+NAME_PUNCTUATION_RE = re.compile(r"[:.,]")
+SIZE_RE = re.compile(r"\d+\s*(ml|floz|g|oz)", re.IGNORECASE)
+
+def _strip_line_noise(match: re.Match) -> str:
+    return "," if match.group() in BULLETS else ""
 
 def process_ingredients_text(full_text: str) -> str:
     """Process OCR text to extract clean ingredients list"""
-    # Patterns that indicate end of ingredients section
-    END_MARKERS = [
-        r'\n\s*\n',       # Blank line
-        r' {2,}',         # Excessive spaces
-        r'(?i)\b(?:distribut|product of|made in|www\.|http|Ml|Floz|g|oz)\b',  # Common end markers
-    ]
-    
     # Find the ingredients section
     ingredients_section = extract_ingredients_section(full_text)
     
-    # Process each line until we hit an end marker
-    lines = ingredients_section.split('\n')
-    ingredients = []
-    
-    for line in lines:
-        # Stop if we hit an end marker
-        if any(re.search(marker, line) for marker in END_MARKERS):
-            break
-            
-        # Clean and process the line
-        cleaned = clean_ingredient_line(line)
-        if cleaned:
-            ingredients.extend(cleaned)
-    
-    # Remove duplicates while preserving order
+    # Process each line until we hit an end marker, de-duplicating as we go
     seen = set()
-    unique_ingredients = [x for x in ingredients if not (x in seen or seen.add(x))]
-    
-    # Apply advanced cleaning
-    cleaned_ingredients = [clean_ingredient_name(ing) for ing in unique_ingredients]
-    cleaned_ingredients = [ing for ing in cleaned_ingredients if ing and len(ing) > 2]
+    cleaned_ingredients = []
+    for line in ingredients_section.split("\n"):
+        if END_MARKER_RE.search(line):
+            break
+
+        for ingredient in clean_ingredient_line(line):
+            if ingredient in seen:
+                continue
+            seen.add(ingredient)
+
+            # Apply advanced cleaning
+            ingredient = clean_ingredient_name(ingredient)
+            if ingredient and len(ingredient) > 2:
+                cleaned_ingredients.append(ingredient)
     
     return ', '.join(cleaned_ingredients)
 
 def extract_ingredients_section(text: str) -> str:
     """Find the ingredients section in the OCR text"""
-    # Common ingredient section headers
-    headers = [
-        "ingredients", "ingrédients", "ingredientes", "成分",
-        "contains", "composants", "active ingredients"
-    ]
-    
-    for header in headers:
-        pattern = fr"{header}[:\s]*(.*?)(?:\n\n|$)"
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    for pattern in SECTION_HEADER_PATTERNS:
+        match = pattern.search(text)
         if match:
             return match.group(1).strip()
     
@@ -181,53 +233,26 @@ def extract_ingredients_section(text: str) -> str:
 
 def clean_ingredient_line(line: str) -> list[str]:
     """Clean a single line of potential ingredients"""
-    # Remove unwanted content
-    line = re.sub(r'\([^)]*\)', '', line)  # Remove parentheses
-    line = re.sub(r'\d+%?', '', line)      # Remove numbers/percentages
-    line = re.sub(r'[•\*▪➢–—]', ',', line) # Replace bullet points
-    
-    # Split by commas and clean each item
-    ingredients = []
-    for item in line.split(','):
-        ingredient = item.strip()
-        
-        # Skip empty items and common non-ingredients
-        if not ingredient or len(ingredient) < 3:
-            continue
-            
-        # Standardize capitalization
-        ingredient = ingredient.title()
-        
-        ingredients.append(ingredient)
+    # Remove parentheses and numbers, turn bullet points into separators
+    line = LINE_NOISE_RE.sub(_strip_line_noise, line)
     
-    return ingredients
+    # Split by commas, skipping empty items and common non-ingredients,
+    # and standardize capitalization
+    return [
+        item.strip().title()
+        for item in line.split(",")
+        if len(item.strip()) >= 3
+    ]
 
 def clean_ingredient_name(ingredient: str) -> str:
     """Clean and standardize ingredient names"""
     # Remove special characters and brand names
-    ingredient = re.sub(r'[:.,]', '', ingredient)
+    ingredient = NAME_PUNCTUATION_RE.sub("", ingredient)
     
     # Common OCR misreadings correction
-    corrections = {
-        r"Glydern": "Glycerin",
-        r"Centagaythrty": "Cetearyl",
-        r"Tetraethyl Hexandate": "Ethylhexanoate",
-        r"Propamediole": "Propanediol",
-        r"Eumonium Polyarn On Dime Thyl Taurate": "Behentrimonium Methosulfate",
-        r"Polysoreate": "Polysorbate",
-        r"Co Ceramide Np": "Ceramide NP",
-        r"Coco-Betane": "Cocamidopropyl Betaine",
-        r"Fanthenol": "Panthenol",
-        r"Ml - \. Floz\.": "",
-        r"\bAqua\b": "Water",
-        r"\bWater\b": "Water",
-        r"\bEau\b": "Water"
-    }
-    
-    for pattern, replacement in corrections.items():
-        ingredient = re.sub(pattern, replacement, ingredient, flags=re.IGNORECASE)
+    ingredient = ocr_corrections.apply(ingredient)
     
     # Remove size information
-    ingredient = re.sub(r"\d+\s*(ml|floz|g|oz)", "", ingredient, flags=re.IGNORECASE)
+    ingredient = SIZE_RE.sub("", ingredient)
     
-    return ingredient.strip()
\ No newline at end of file
+    return ingredient.strip()
@@ -0,0 +1,241 @@
+import os
+import io
+import asyncio
+import logging
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import aiohttp
+from dotenv import load_dotenv
+from backend.app.config import cfg
+
+# Load environment variables
+dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
+load_dotenv(dotenv_path)
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OCR_CFG = cfg["ocr"]
+
+# OCR.space form fields sent alongside the image part
+OCR_SPACE_OPTIONS = {
+    "language": "eng",
+    "isOverlayRequired": "false",
+    "filetype": "JPG",
+    "OCREngine": "2",
+    "scale": "true",
+    "detectOrientation": "true"
+}
+
+
+class OCRProvider(ABC):
+    """Turns an optimized JPEG into raw label text"""
+
+    name = "base"
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def extract_text(self, image_bytes: bytes) -> str:
+        """Raw text of the label in the image"""
+
+
+class OCRSpaceProvider(OCRProvider):
+    """Remote OCR.space API"""
+
+    name = "ocr_space"
+
+    def __init__(self, provider_cfg: dict):
+        self.url = provider_cfg["url"]
+        self.timeout = provider_cfg["timeout"]
+        self.attempts = provider_cfg["attempts"]
+        self.api_key = os.getenv("OCR_SPACE_API_KEY")
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _build_form(self, image_bytes: bytes) -> aiohttp.FormData:
+        """Multipart body with the JPEG as a binary file part (no base64 inflation)"""
+        form = aiohttp.FormData()
+        for key, value in OCR_SPACE_OPTIONS.items():
+            form.add_field(key, value)
+        form.add_field("file", image_bytes, filename="label.jpg", content_type="image/jpeg")
+        return form
+
+    async def extract_text(self, image_bytes: bytes) -> str:
+        if not self.api_key:
+            logger.error("OCR_SPACE_API_KEY environment variable not set")
+            raise RuntimeError("OCR API key missing")
+        await self.start()
+
+        headers = {"apikey": self.api_key}
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        for attempt in range(1, self.attempts + 1):
+            # A FormData body can only be sent once; the image buffer itself is reused
+            try:
+                async with self._session.post(
+                    self.url,
+                    data=self._build_form(image_bytes),
+                    headers=headers,
+                    timeout=timeout
+                ) as response:
+                    if response.status >= 500 and attempt < self.attempts:
+                        logger.warning(f"OCR API returned {response.status}, retrying ({attempt}/{self.attempts})")
+                        continue
+
+                    result = await response.json(content_type=None)
+
+                    if response.status != 200 or result.get("IsErroredOnProcessing", True):
+                        error = result.get("ErrorMessage", "Unknown OCR error")
+                        logger.error(f"OCR error: {error}")
+                        raise RuntimeError("OCR processing failed")
+
+                    return result["ParsedResults"][0]["ParsedText"]
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.attempts:
+                    raise
+                logger.warning(f"OCR API request failed ({str(e) or type(e).__name__}), retrying ({attempt}/{self.attempts})")
+
+        raise RuntimeError("OCR processing failed")
+
+
+# --- In-process engines -------------------------------------------------------
+# These run inside pool workers: the engine is loaded once per worker process by
+# the pool initializer and reused for every image that worker handles.
+
+_worker_engine = None
+_worker_engine_name = None
+_worker_load_error = None
+
+def _load_worker_engine(engine_name: str) -> None:
+    """Pool initializer: load the OCR engine once per worker (CPU only)"""
+    global _worker_engine, _worker_engine_name, _worker_load_error
+    _worker_engine_name = engine_name
+    try:
+        if engine_name == "paddle":
+            from paddleocr import PaddleOCR
+            _worker_engine = PaddleOCR(use_angle_cls=True, lang="en", use_gpu=False, show_log=False)
+        elif engine_name == "tesseract":
+            import pytesseract
+            pytesseract.get_tesseract_version()  # Fails fast if the binary is missing
+            _worker_engine = pytesseract
+        else:
+            raise ValueError(f"Unknown OCR engine: {engine_name}")
+    except Exception as e:
+        # Don't raise: a failing initializer breaks the whole pool
+        _worker_load_error = f"{type(e).__name__}: {e}"
+
+def _worker_ready() -> Optional[str]:
+    """Return the load error of this worker's engine, or None when it is usable"""
+    return _worker_load_error
+
+def _run_worker_ocr(image_bytes: bytes) -> str:
+    """Run the loaded engine on one image and return its text, top to bottom"""
+    if _worker_engine is None:
+        raise RuntimeError(f"OCR engine unavailable: {_worker_load_error}")
+
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_bytes))
+
+    if _worker_engine_name == "tesseract":
+        return _worker_engine.image_to_string(image, lang="eng")
+
+    import numpy as np
+    result = _worker_engine.ocr(np.array(image.convert("RGB")), cls=True)
+    lines = [line[1][0] for page in (result or []) for line in (page or [])]
+    return "\n".join(lines)
+
+
+class LocalOCRProvider(OCRProvider):
+    """PaddleOCR or Tesseract running in a process pool"""
+
+    def __init__(self, engine_name: str, workers: int):
+        self.name = engine_name
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.available = False
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        # spawn keeps workers clear of the event loop's threads and sockets
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_engine,
+            initargs=(self.name,)
+        )
+        loop = asyncio.get_running_loop()
+        errors = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _worker_ready) for _ in range(self.workers))
+        )
+        error = next((e for e in errors if e), None)
+        if error:
+            logger.error(f"Local OCR engine '{self.name}' failed to load: {error}")
+            await self.close()
+            return
+        self.available = True
+        logger.info(f"✅ Local OCR engine '{self.name}' loaded in {self.workers} worker(s)")
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self.available = False
+
+    async def extract_text(self, image_bytes: bytes) -> str:
+        if not self.available:
+            raise RuntimeError(f"OCR engine '{self.name}' is not loaded")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _run_worker_ocr, image_bytes)
+
+
+def build_provider(name: str) -> OCRProvider:
+    if name == "ocr_space":
+        return OCRSpaceProvider(OCR_CFG["ocr_space"])
+    if name in ("paddle", "tesseract"):
+        return LocalOCRProvider(name, OCR_CFG["workers"])
+    raise ValueError(f"Unknown OCR provider: {name}")
+
+
+class OCRService:
+    """Configured OCR provider with an optional fallback provider"""
+
+    def __init__(self, provider_names: List[str]):
+        self.providers = [build_provider(name) for name in dict.fromkeys(provider_names) if name]
+
+    async def start(self) -> None:
+        for provider in self.providers:
+            await provider.start()
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+    async def extract_text(self, image_bytes: bytes) -> str:
+        last_error = None
+        for provider in self.providers:
+            try:
+                return await provider.extract_text(image_bytes)
+            except Exception as e:
+                logger.warning(f"OCR provider '{provider.name}' failed: {str(e)}")
+                last_error = e
+        raise RuntimeError("All OCR providers failed") from last_error
+
+
+ocr_service = OCRService([OCR_CFG["provider"], OCR_CFG.get("fallback")])
@@ -0,0 +1,17 @@
+# Ordinal scales for report ratings; higher is better for the user
+SAFETY_RANK = {"safe": 2, "caution": 1, "unsafe": 0}
+BARRIER_RANK = {"positive": 2, "neutral": 1, "negative": 0}
+ALLERGY_RANK = {"low": 2, "medium": 1, "high": 0}
+
+
+def rank(ranks: dict, value, default: int = 1) -> int:
+    """Position of a rating on its scale; unknown values count as the middle"""
+    return ranks.get(str(value).strip().lower(), default)
+
+
+def suitability(overall: dict) -> int:
+    """Suitability score of an overall assessment, 3 when missing or malformed"""
+    try:
+        return int(overall.get("suitability_score", 3))
+    except (TypeError, ValueError):
+        return 3
@@ -0,0 +1,87 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, List
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words that carry no signal for matching questions against ingredient records
+STOPWORDS = frozenset((
+    "a an and are as at be but by can could do does for from has have how i if in into is it its "
+    "me my of on or should so that the their them then there these they this to was what when "
+    "which while who why will with would you your product ingredient ingredients"
+).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords dropped and plural endings folded"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", str(text or "").lower()):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a small set of documents, serializable to plain dicts.
+
+    Built once per report and stored with its chat context, so scoring a
+    question is a few dictionary lookups per query term.
+    """
+
+    def __init__(self, doc_terms: List[Dict[str, int]], df: Dict[str, int], k1: float = 1.2, b: float = 0.75):
+        self.doc_terms = doc_terms
+        self.df = df
+        self.k1 = k1
+        self.b = b
+        self.lengths = [sum(terms.values()) for terms in doc_terms]
+        self.avgdl = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    @classmethod
+    def build(cls, documents: List[str], **params) -> "BM25Index":
+        doc_terms = [dict(Counter(tokenize(document))) for document in documents]
+        df = Counter(term for terms in doc_terms for term in terms)
+        return cls(doc_terms, dict(df), **params)
+
+    def to_dict(self) -> dict:
+        return {"doc_terms": self.doc_terms, "df": self.df, "k1": self.k1, "b": self.b}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        return cls(data["doc_terms"], data["df"], data.get("k1", 1.2), data.get("b", 0.75))
+
+    def idf(self, term: str) -> float:
+        n = len(self.doc_terms)
+        df = self.df.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> List[float]:
+        terms = set(tokenize(query))
+        results = [0.0] * len(self.doc_terms)
+        if not terms or not self.avgdl:
+            return results
+
+        for term in terms:
+            if term not in self.df:
+                continue
+            idf = self.idf(term)
+            for i, doc in enumerate(self.doc_terms):
+                tf = doc.get(term)
+                if tf:
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avgdl)
+                    results[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return results
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """Indices of the k best-matching documents with a positive score, best first"""
+        scored = [(score, i) for i, score in enumerate(self.scores(query)) if score > 0]
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [i for _, i in scored[:k]]
@@ -1,10 +1,10 @@
 import os
 import json
 import logging
-import aiohttp
 import re
 from dotenv import load_dotenv
 from typing import List, Dict, Optional
+from backend.app.llm_client import llm_client, LLMAPIError
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -14,12 +14,9 @@ load_dotenv(dotenv_path)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-
 async def generate_routine_with_groq(time_of_day: str, skin_type: str, concerns: List[str]) -> Optional[Dict]:
     """Generate skincare routine using Groq API"""
-    if not GROQ_API_KEY:
+    if not llm_client.api_key:
         logger.error("GROQ_API_KEY is not set")
         return None
     
@@ -53,42 +50,23 @@ Return ONLY valid JSON in this format:
 """
 
     
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "llama3-70b-8192",
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.0,
-        "max_tokens": 1500,
-        "response_format": {"type": "json_object"}
-    }
-    
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                GROQ_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30
-            ) as response:
-                if response.status != 200:
-                    error = await response.text()
-                    logger.error(f"Groq API error: {response.status} - {error}")
-                    return None
-                
-                data = await response.json()
-                content = data["choices"][0]["message"]["content"]
-                
-                # Clean and parse JSON
-                json_match = re.search(r'\{[\s\S]*\}', content)
-                if json_match:
-                    return json.loads(json_match.group(0))
-                
-                logger.error("Failed to extract JSON from response")
-                return None
+        content = await llm_client.complete(
+            "routine",
+            [{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+
+        # Clean and parse JSON
+        json_match = re.search(r'\{[\s\S]*\}', content)
+        if json_match:
+            return json.loads(json_match.group(0))
+
+        logger.error("Failed to extract JSON from response")
+        return None
+    except LLMAPIError as e:
+        logger.error(f"Groq API error: {e.status} - {e.body}")
+        return None
     except Exception as e:
         logger.error(f"Groq API request failed: {str(e)}")
         return None
\ No newline at end of file
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import argparse
+from typing import Iterable, List, Optional
+from backend.app.knowledge_base import ingredient_kb, COMEDOGENIC_THRESHOLD
+from backend.app.ratings import SAFETY_RANK, BARRIER_RANK, ALLERGY_RANK, rank, suitability
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keywords that map free-text skin concerns onto knowledge base tags
+CONCERN_KEYWORDS = {
+    "acne": ("acne", "blemish", "breakout", "pimple"),
+    "aging": ("aging", "ageing", "wrinkle", "fine line", "firm"),
+    "dark_circles": ("dark circle", "puff", "under eye", "under-eye"),
+    "pores": ("pore",),
+    "blackheads": ("blackhead", "congest"),
+    "barrier": ("barrier", "damaged", "compromised"),
+    "hyperpigmentation": ("pigment", "dark spot", "melasma", "uneven", "discolor"),
+    "redness": ("redness", "rosacea", "flush", "irritat"),
+    "dry": ("dry", "dehydrat", "flak"),
+    "sensitive": ("sensitiv", "eczema", "reactive"),
+    "oily": ("oily", "shine", "sebum")
+}
+
+# Profiles for which pore-clogging ingredients count against suitability
+COMEDOGENIC_SENSITIVE_TAGS = {"acne", "oily", "blackheads", "pores", "combination"}
+
+# Ingredients earlier on the label are present at higher concentration
+def position_weight(index: int) -> float:
+    return 1 / (1 + index / 5)
+
+
+def profile_tags(skin_type: str, concerns: Optional[list]) -> set:
+    """Knowledge base tags describing a user's skin type and concerns"""
+    tags = {(skin_type or "").strip().lower()}
+    for concern in concerns or []:
+        text = concern.lower()
+        tags.update(tag for tag, keywords in CONCERN_KEYWORDS.items() if any(k in text for k in keywords))
+    tags.discard("")
+    return tags
+
+
+def score_ingredients(records: List[dict], skin_type: str, concerns: Optional[list]) -> dict:
+    """Deterministic overall_assessment from per-ingredient records and the skin profile.
+
+    Records may come from the LLM, the cache or the knowledge base; knowledge base
+    tags are used when the ingredient is known, the record's own ratings otherwise.
+    """
+    tags = profile_tags(skin_type, concerns)
+    concerns_str = ", ".join(concerns) if concerns else "no specific concerns"
+
+    barrier_balance = 0.0
+    benefit = 0.0
+    harm = 0.0
+    unsafe, caution, high_allergy, medium_allergy = [], [], [], []
+    helpful, unsuitable, comedogenic = [], [], []
+
+    for index, record in enumerate(records):
+        name = record.get("name")
+        if not name or name == "Unknown":
+            continue
+        weight = position_weight(index)
+        entry = ingredient_kb.get(name) or {}
+
+        safety = rank(SAFETY_RANK, entry.get("safety", record.get("safety")))
+        barrier = rank(BARRIER_RANK, entry.get("barrier_impact", record.get("barrier_impact")))
+        allergy = rank(ALLERGY_RANK, entry.get("allergy_potential", record.get("allergy_potential")))
+
+        if safety == 0:
+            unsafe.append(name)
+            harm += 1.5 * weight
+        elif safety == 1:
+            caution.append(name)
+        if allergy == 0:
+            high_allergy.append(name)
+        elif allergy == 1:
+            medium_allergy.append(name)
+        barrier_balance += (barrier - 1) * weight
+
+        if tags & entry.get("good_for", frozenset()):
+            helpful.append(name)
+            benefit += weight
+        if tags & entry.get("avoid_for", frozenset()):
+            unsuitable.append(name)
+            harm += weight
+        elif entry.get("comedogenic_rating", 0) >= COMEDOGENIC_THRESHOLD and tags & COMEDOGENIC_SENSITIVE_TAGS:
+            comedogenic.append(name)
+            harm += weight
+
+    if unsafe:
+        safety_rating = "unsafe"
+    elif caution:
+        safety_rating = "caution"
+    else:
+        safety_rating = "safe"
+
+    if barrier_balance > 0.5:
+        barrier_impact = "positive"
+    elif barrier_balance < -0.5:
+        barrier_impact = "negative"
+    else:
+        barrier_impact = "neutral"
+
+    sensitive = "sensitive" in tags
+    if len(high_allergy) >= 2 or (high_allergy and sensitive):
+        allergy_risk = "high"
+    elif high_allergy or len(medium_allergy) >= 2:
+        allergy_risk = "medium"
+    else:
+        allergy_risk = "low"
+
+    # Neutral 3, up to +2 for ingredients that target the profile, down to -2 for ones to avoid
+    suitability_score = max(1, min(5, round(3 + min(2.0, 0.6 * benefit) - min(2.0, 0.8 * harm))))
+
+    key_concerns = []
+    if unsafe:
+        key_concerns.append(f"Contains ingredients rated unsafe: {', '.join(unsafe)}")
+    if unsuitable:
+        key_concerns.append(f"May not suit {skin_type} skin or {concerns_str}: {', '.join(unsuitable)}")
+    if comedogenic:
+        key_concerns.append(f"Pore-clogging ingredients: {', '.join(comedogenic)}")
+    if high_allergy:
+        key_concerns.append(f"Common allergens: {', '.join(high_allergy)}")
+
+    notes = f"Computed from ingredient data for {skin_type} skin with {concerns_str}."
+    if helpful:
+        notes += f" Ingredients that suit this profile: {', '.join(helpful)}."
+    if not (helpful or unsuitable or comedogenic):
+        notes += " No ingredients stand out as especially helpful or problematic for this profile."
+
+    return {
+        "safety_rating": safety_rating,
+        "barrier_impact": barrier_impact,
+        "allergy_risk": allergy_risk,
+        "suitability_score": suitability_score,
+        "key_concerns": key_concerns,
+        "personalized_notes": notes,
+        "provisional": True
+    }
+
+
+def backfill_assessment(overall: dict, local: dict) -> dict:
+    """Fill fields the model left out or garbled with the local values"""
+    for key in ("safety_rating", "barrier_impact", "allergy_risk"):
+        ranks = {"safety_rating": SAFETY_RANK, "barrier_impact": BARRIER_RANK, "allergy_risk": ALLERGY_RANK}[key]
+        if str(overall.get(key, "")).strip().lower() not in ranks:
+            overall[key] = local[key]
+    try:
+        if not 1 <= int(overall.get("suitability_score")) <= 5:
+            raise ValueError
+    except (TypeError, ValueError):
+        overall["suitability_score"] = local["suitability_score"]
+    overall.setdefault("key_concerns", local["key_concerns"])
+    overall.setdefault("personalized_notes", local["personalized_notes"])
+    return overall
+
+
+def assessment_disagreement(llm: dict, local: dict) -> dict:
+    """Per-field differences between an LLM assessment and the local one (positive = LLM rates higher)"""
+    return {
+        "suitability_score": suitability(llm) - local["suitability_score"],
+        "safety_rating": rank(SAFETY_RANK, llm.get("safety_rating")) - rank(SAFETY_RANK, local["safety_rating"]),
+        "barrier_impact": rank(BARRIER_RANK, llm.get("barrier_impact")) - rank(BARRIER_RANK, local["barrier_impact"]),
+        "allergy_risk": rank(ALLERGY_RANK, llm.get("allergy_risk")) - rank(ALLERGY_RANK, local["allergy_risk"])
+    }
+
+
+def cross_check(reports: Iterable[dict], skin_type: str, concerns: Optional[list]) -> dict:
+    """Agreement statistics between stored LLM reports and the local scorer"""
+    total = 0
+    agree = {field: 0 for field in ("suitability_score", "safety_rating", "barrier_impact", "allergy_risk")}
+    large_gaps = 0
+    for report in reports:
+        records = report.get("ingredients", [])
+        if not records:
+            continue
+        total += 1
+        diff = assessment_disagreement(report.get("overall_assessment", {}), score_ingredients(records, skin_type, concerns))
+        for field, delta in diff.items():
+            agree[field] += delta == 0 if field != "suitability_score" else abs(delta) <= 1
+        large_gaps += abs(diff["suitability_score"]) >= 2
+
+    return {
+        "reports": total,
+        "agreement": {field: round(count / total, 3) if total else 0.0 for field, count in agree.items()},
+        "suitability_gaps_of_2_or_more": large_gaps
+    }
+
+
+async def _cross_check_cache(limit: int) -> dict:
+    """Cross-check the cached analyses, grouped by the skin profile each was made for"""
+    from backend.app.cache import analysis_cache
+    by_profile = {}
+    cursor = analysis_cache.collection.find({}, {"analysis": 1, "profile": 1}).limit(limit)
+    async for document in cursor:
+        by_profile.setdefault(document.get("profile", "normal|"), []).append(document["analysis"])
+
+    results = {}
+    for profile, reports in by_profile.items():
+        skin_type, _, concerns_part = profile.partition("|")
+        results[profile] = cross_check(reports, skin_type, [c for c in concerns_part.split(",") if c])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cross-check cached LLM analyses against the local scorer")
+    parser.add_argument("--limit", type=int, default=1000, help="maximum cached analyses to read")
+    args = parser.parse_args()
+
+    for profile, stats in asyncio.run(_cross_check_cache(args.limit)).items():
+        print(f"{profile or '(no profile)'}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import logging
+from typing import List, Tuple
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JSONStreamParser:
+    """Incrementally scans a JSON object as it is generated.
+
+    Emits ("item", key, value) for every element of a top-level array once the
+    element is complete, and ("field", key, value) once any top-level value is
+    complete, so callers can act on parts of a model response before the rest
+    has been generated. Text before the opening brace is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key = None
+        self._pending_key = None
+        self._string_start = None
+        self._value_start = None
+        self._item_start = None
+        self._array_key = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        events = []
+        start = len(self._text)
+        self._text += chunk
+
+        for index in range(start, len(self._text)):
+            char = self._text[index]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    # A string at depth 1 before a colon is a top-level key
+                    if self._depth == 1 and self._value_start is None:
+                        self._pending_key = self._text[self._string_start + 1:index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._string_start = index
+                continue
+
+            if char == ":" and self._depth == 1 and self._value_start is None:
+                self._key = self._pending_key
+                self._value_start = index + 1
+                continue
+
+            if char in "{[":
+                self._depth += 1
+                if self._depth == 2 and char == "[":
+                    self._array_key = self._key
+                elif self._depth == 3 and self._array_key is not None and self._item_start is None:
+                    self._item_start = index
+                continue
+
+            if char in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None:
+                    events.extend(self._emit_item(index))
+                elif self._depth == 1:
+                    events.extend(self._emit_field(index + 1))
+                    self._array_key = None
+                elif self._depth == 0 and self._value_start is not None:
+                    # Closing brace right after a scalar last value
+                    events.extend(self._emit_field(index))
+                continue
+
+            if char == "," and self._depth == 1 and self._value_start is not None:
+                # End of a scalar top-level value
+                events.extend(self._emit_field(index))
+
+        return events
+
+    def _emit_item(self, end: int):
+        raw = self._text[self._item_start:end + 1]
+        self._item_start = None
+        try:
+            return [("item", self._array_key, json.loads(raw))]
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed streamed item under '{self._array_key}'")
+            return []
+
+    def _emit_field(self, end: int):
+        raw = self._text[self._value_start:end].strip()
+        key = self._key
+        self._value_start = None
+        self._key = None
+        if not raw:
+            return []
+        try:
+            return [("field", key, json.loads(raw))]
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed streamed field '{key}'")
+            return []
+
+    @property
+    def text(self) -> str:
+        return self._text
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+from fastapi import HTTPException, UploadFile
+from starlette.formparsers import MultiPartParser
+from starlette.responses import JSONResponse
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UPLOADS_CFG = cfg["uploads"]
+MAX_UPLOAD_BYTES = UPLOADS_CFG["max_bytes"]
+
+# Multipart file parts above this size are rolled over from memory to a temp file.
+# Starlette only exposes this as a class attribute, so it applies to every app in
+# the process; Starlette's own default is the same 1 MB.
+MultiPartParser.spool_max_size = UPLOADS_CFG["spool_max_bytes"]
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized uploads before their body is parsed or spooled to disk.
+
+    A Content-Length over the limit is rejected up front. Chunked uploads carry no
+    length, so the bytes actually received are counted and the request is aborted
+    with a 413 as soon as they pass the limit.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"Upload exceeds {self.max_bytes // (1024 * 1024)} MB limit"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            logger.warning(f"Rejected {content_length.decode()} byte upload to {scope['path']}")
+            response = JSONResponse({"detail": self._too_large().detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    logger.warning(f"Aborted upload to {scope['path']} after {received} bytes")
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413
+                    raise self._too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def upload_size(upload: UploadFile) -> int:
+    """Size of a parsed upload without reading it into memory"""
+    if upload.size is not None:
+        return upload.size
+    position = upload.file.tell()
+    upload.file.seek(0, 2)
+    size = upload.file.tell()
+    upload.file.seek(position)
+    return size
+
+
+def is_upload_too_large(upload: UploadFile) -> bool:
+    """Per-endpoint check for callers not behind UploadSizeLimitMiddleware"""
+    return upload_size(upload) > MAX_UPLOAD_BYTES
+
+
+class UploadStore:
+    """Short-lived on-disk store for uploaded images, shared by every worker on the host.
+
+    Lets a client upload an image once and refer to it by ID in later requests.
+    Files are namespaced by owner so IDs can't be used across accounts.
+    """
+
+    def __init__(self, directory: Path, ttl_seconds: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, owner: str, upload_id: str) -> Path:
+        owner_key = hashlib.sha256(owner.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{owner_key}-{upload_id}"
+
+    def save(self, owner: str, source: BinaryIO) -> str:
+        """Stream an upload to disk in chunks and return its ID"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        source.seek(0)
+        with open(self._path(owner, upload_id), "wb") as target:
+            shutil.copyfileobj(source, target, UPLOADS_CFG["chunk_bytes"])
+        return upload_id
+
+    def open(self, owner: str, upload_id: str) -> Optional[BinaryIO]:
+        """Open a stored upload for reading, or None if unknown or expired"""
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            return None
+        path = self._path(owner, upload_id)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_seconds:
+                return None
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    def purge_expired(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for path in self.directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+upload_store = UploadStore(
+    Path(UPLOADS_CFG.get("store_dir") or os.path.join(tempfile.gettempdir(), "skinsage_uploads")),
+    ttl_seconds=UPLOADS_CFG["store_ttl_seconds"]
+)
@@ -1,11 +1,15 @@
 import os
 import re
-import requests
+import asyncio
+import aiohttp
 import logging
+from typing import Optional, Tuple
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 import json
+from backend.app.config import cfg
+from backend.app.workers import run_cpu
 
 # Load environment variables
 dotenv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
@@ -17,35 +21,75 @@ logger = logging.getLogger(__name__)
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CX = os.getenv("GOOGLE_CX")
+GOOGLE_CSE_URL = "https://www.googleapis.com/customsearch/v1"
 
-def search_google_cse(query, num_results=3):
+SCRAPER_CFG = cfg["scraper"]
+
+BROWSER_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/91.0.4472.124 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+# Shared pooled session, created lazily inside the running event loop
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the app-wide scraper session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=SCRAPER_CFG["pool_size"],
+            limit_per_host=SCRAPER_CFG["pool_size_per_host"],
+            ttl_dns_cache=300
+        )
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+async def close_session() -> None:
+    """Close the shared scraper session (called on app shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+async def search_google_cse(query, num_results=3):
     """Search Google CSE and return JSON results"""
-    url = "https://www.googleapis.com/customsearch/v1"
     params = {
         "key": GOOGLE_API_KEY,
         "cx": GOOGLE_CX,
         "q": query,
         "num": num_results
     }
-    resp = requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
+    timeout = aiohttp.ClientTimeout(total=SCRAPER_CFG["search_timeout"])
+    async with get_session().get(GOOGLE_CSE_URL, params=params, timeout=timeout) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
     return data.get("items", [])
 
-def extract_ingredients_from_url(url):
-    """Download page and extract ingredients section with multiple strategies"""
+async def extract_ingredients_from_url(url):
+    """Download page and extract its ingredients section"""
     try:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/91.0.4472.124 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9"
-        }
-        resp = requests.get(url, headers=headers, timeout=15)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        timeout = aiohttp.ClientTimeout(total=SCRAPER_CFG["page_timeout"])
+        async with get_session().get(url, headers=BROWSER_HEADERS, timeout=timeout) as resp:
+            resp.raise_for_status()
+            html = await resp.text(errors="replace")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to fetch {url}: {str(e)}")
+        return None
+
+    # HTML parsing is CPU-bound; keep it off the event loop
+    return await run_cpu(extract_ingredients_from_html, html)
+
+def extract_ingredients_from_html(html):
+    """Extract ingredients section from a product page with multiple strategies"""
+    try:
+        soup = BeautifulSoup(html, "html.parser")
         
         # Strategy 1: Look for common ingredient section patterns
         patterns = [
@@ -202,7 +246,17 @@ def clean_ingredient_text(raw_text: str) -> str:
     
     return ", ".join(unique_ingredients)
 
-def get_ingredients_by_product_name(product_name):
+async def _try_candidate(url) -> Optional[Tuple[str, str]]:
+    """Fetch one search result and return (ingredients, url) if it has a usable list"""
+    logger.info("Trying URL: %s", url)
+    raw_ingredients = await extract_ingredients_from_url(url)
+    if raw_ingredients:
+        cleaned = clean_ingredient_text(raw_ingredients)
+        if cleaned and len(cleaned) > 20:
+            return cleaned, url
+    return None
+
+async def get_ingredients_by_product_name(product_name):
     """Find product ingredients with intelligent search"""
     # Try brand-specific searches first
     brands = {
@@ -223,26 +277,26 @@ def get_ingredients_by_product_name(product_name):
     query = f"{product_name} ingredients {brand_query}"
     logger.info("Searching for: %s", query)
     
-    results = search_google_cse(query)
+    results = await search_google_cse(query)
     if not results:
         # Fallback to generic search
         query = f"{product_name} ingredients"
-        results = search_google_cse(query)
+        results = await search_google_cse(query)
         if not results:
             logger.warning("No search results found.")
             return None, None
     
-    # Try each result until we find ingredients
-    for result in results:
-        top_url = result["link"]
-        logger.info("Trying URL: %s", top_url)
-        raw_ingredients = extract_ingredients_from_url(top_url)
-        
-        if raw_ingredients:
-            cleaned = clean_ingredient_text(raw_ingredients)
-            if cleaned and len(cleaned) > 20:
+    # Fetch every result concurrently and take the first usable ingredient list
+    tasks = [asyncio.create_task(_try_candidate(result["link"])) for result in results]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            found = await next_done
+            if found:
                 logger.info("Successfully extracted ingredients")
-                return cleaned, top_url
+                return found
+    finally:
+        for task in tasks:
+            task.cancel()
     
     logger.warning("No ingredients found in any results")
     return None, None
\ No newline at end of file
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from backend.app.config import cfg
+
+# Configure logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CPU_POOL_CFG = cfg["cpu_pool"]
+
+_executor: Optional[Executor] = None
+
+def get_executor() -> Executor:
+    """Return the shared CPU worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        kind = CPU_POOL_CFG["kind"]
+        max_workers = CPU_POOL_CFG["max_workers"]
+        if kind == "process":
+            # Functions and arguments must be picklable, i.e. module-level
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        elif kind == "thread":
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cpu")
+        else:
+            raise ValueError(f"Unknown cpu_pool kind: {kind}")
+        logger.info(f"CPU {kind} pool started with {max_workers} workers")
+    return _executor
+
+def is_process_pool() -> bool:
+    """Whether work crosses a process boundary (arguments must then be picklable)"""
+    return CPU_POOL_CFG["kind"] == "process"
+
+async def run_cpu(func, *args, **kwargs):
+    """Run a CPU-bound function on the worker pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown() -> None:
+    """Stop the worker pool (called on app shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
@@ -0,0 +1,96 @@
+"""Microbenchmark for INCI name resolution against a full-size name list.
+
+The bundled list has about 300 names; a complete INCI export has over 20k.
+This pads the bundled list with synthetic INCI-style names built from its own
+vocabulary (so trigram postings are as crowded as in a real export), then times
+exact lookups and uncached fuzzy lookups of OCR misreadings.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_inci_resolver [--names 20000] [--repeat 20]
+"""
+import random
+import argparse
+import timeit
+from backend.app.config import cfg
+from backend.app.inci import InciResolver, INCI_NAMES_PATH, WORD_RE
+
+INCI_CFG = cfg["inci"]
+
+# Substitutions OCR engines make, applied once per query
+MISREADINGS = (("i", "l"), ("l", "i"), ("o", "0"), ("m", "rn"), ("e", "c"), ("u", "v"))
+
+
+def bundled_names() -> list[str]:
+    lines = INCI_NAMES_PATH.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def synthetic_names(names: list[str], count: int, seed: int = 7) -> list[str]:
+    """Pad names up to count with unique INCI-style names made from their words"""
+    rng = random.Random(seed)
+    words = sorted({word.title() for name in names if "=>" not in name for word in WORD_RE.findall(name.lower()) if len(word) > 2})
+    padded, seen = list(names), {name.lower() for name in names}
+    while len(padded) < count:
+        name = " ".join(rng.sample(words, rng.choice((2, 2, 3))))
+        if rng.random() < 0.15:
+            name = f"PEG-{rng.choice((4, 8, 20, 40, 75, 100, 150))} {name}"
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            padded.append(name)
+    return padded
+
+
+def misread(name: str, rng: random.Random) -> str:
+    options = [(a, b) for a, b in MISREADINGS if a in name]
+    if not options:
+        return name + "x"
+    a, b = rng.choice(options)
+    positions = [i for i in range(len(name)) if name.startswith(a, i)]
+    i = rng.choice(positions)
+    return name[:i] + b + name[i + len(a):]
+
+
+def build(names: list[str], cache_size: int) -> InciResolver:
+    return InciResolver(
+        names,
+        min_confidence=INCI_CFG["min_confidence"],
+        max_candidates=INCI_CFG["max_candidates"],
+        cache_size=cache_size,
+        max_distance=INCI_CFG["max_distance"],
+        min_margin=INCI_CFG["min_margin"]
+    )
+
+
+def time_lookups(resolver: InciResolver, tokens: list[str], fuzzy: bool, repeat: int) -> float:
+    """Best-of-five microseconds per lookup"""
+    runs = timeit.repeat(lambda: [resolver.resolve(token, fuzzy) for token in tokens], number=repeat, repeat=5)
+    return min(runs) / (repeat * len(tokens)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=20000, help="size of the padded name list")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the queries per run")
+    args = parser.parse_args()
+
+    bundled = bundled_names()
+    rng = random.Random(11)
+    real = [name for name in bundled if "=>" not in name]
+    exact = rng.sample(real, 200)
+    ocr_tokens = [misread(name, rng) for name in exact]
+
+    for size in (len(bundled), args.names):
+        names = synthetic_names(bundled, size)
+        # No memoization, so every fuzzy lookup walks the index
+        resolver = build(names, cache_size=0)
+        resolved = sum(resolver.resolve(token)[0] == name for token, name in zip(ocr_tokens, exact))
+        memoized = build(names, cache_size=INCI_CFG["cache_size"])
+        print(f"{len(resolver.names):>6} names: "
+              f"exact {time_lookups(resolver, exact, False, args.repeat):7.1f} us, "
+              f"fuzzy {time_lookups(resolver, ocr_tokens, True, args.repeat):7.1f} us, "
+              f"fuzzy memoized {time_lookups(memoized, ocr_tokens, True, args.repeat):5.1f} us per lookup "
+              f"({resolved}/{len(ocr_tokens)} misreadings resolved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Microbenchmark for the OCR ingredient cleaner.
+
+Runs the current cleaner and the original per-call re.sub implementation over
+a corpus of OCR outputs, checks they produce identical ingredient lists, and
+reports the time per label.
+
+Usage (from the repository root):
+    python -m backend.benchmarks.bench_ingredient_cleaner [--repeat 2000]
+"""
+import re
+import argparse
+import timeit
+from pathlib import Path
+from backend.app.ocr import process_ingredients_text
+
+CORPUS_PATH = Path(__file__).parent / "ocr_corpus.txt"
+SAMPLE_SEPARATOR = "\n=====\n"
+
+
+# --- Original implementation, kept verbatim for comparison ---------------------
+
+def legacy_process_ingredients_text(full_text: str) -> str:
+    """Process OCR text to extract clean ingredients list"""
+    # Patterns that indicate end of ingredients section
+    END_MARKERS = [
+        r'\n\s*\n',       # Blank line
+        r' {2,}',         # Excessive spaces
+        r'(?i)\b(?:distribut|product of|made in|www\.|http|Ml|Floz|g|oz)\b',  # Common end markers
+    ]
+    
+    # Find the ingredients section
+    ingredients_section = _legacy_extract_ingredients_section(full_text)
+    
+    # Process each line until we hit an end marker
+    lines = ingredients_section.split('\n')
+    ingredients = []
+    
+    for line in lines:
+        # Stop if we hit an end marker
+        if any(re.search(marker, line) for marker in END_MARKERS):
+            break
+            
+        # Clean and process the line
+        cleaned = _legacy_clean_ingredient_line(line)
+        if cleaned:
+            ingredients.extend(cleaned)
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_ingredients = [x for x in ingredients if not (x in seen or seen.add(x))]
+    
+    # Apply advanced cleaning
+    cleaned_ingredients = [_legacy_clean_ingredient_name(ing) for ing in unique_ingredients]
+    cleaned_ingredients = [ing for ing in cleaned_ingredients if ing and len(ing) > 2]
+    
+    return ', '.join(cleaned_ingredients)
+
+def _legacy_extract_ingredients_section(text: str) -> str:
+    """Find the ingredients section in the OCR text"""
+    # Common ingredient section headers
+    headers = [
+        "ingredients", "ingrédients", "ingredientes", "成分",
+        "contains", "composants", "active ingredients"
+    ]
+    
+    for header in headers:
+        pattern = fr"{header}[:\s]*(.*?)(?:\n\n|$)"
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            return match.group(1).strip()
+    
+    # Fallback: return entire text if no header found
+    return text
+
+def _legacy_clean_ingredient_line(line: str) -> list[str]:
+    """Clean a single line of potential ingredients"""
+    # Remove unwanted content
+    line = re.sub(r'\([^)]*\)', '', line)  # Remove parentheses
+    line = re.sub(r'\d+%?', '', line)      # Remove numbers/percentages
+    line = re.sub(r'[•\*▪➢–—]', ',', line) # Replace bullet points
+    
+    # Split by commas and clean each item
+    ingredients = []
+    for item in line.split(','):
+        ingredient = item.strip()
+        
+        # Skip empty items and common non-ingredients
+        if not ingredient or len(ingredient) < 3:
+            continue
+            
+        # Standardize capitalization
+        ingredient = ingredient.title()
+        
+        ingredients.append(ingredient)
+    
+    return ingredients
+
+def _legacy_clean_ingredient_name(ingredient: str) -> str:
+    """Clean and standardize ingredient names"""
+    # Remove special characters and brand names
+    ingredient = re.sub(r'[:.,]', '', ingredient)
+    
+    # Common OCR misreadings correction
+    corrections = {
+        r"Glydern": "Glycerin",
+        r"Centagaythrty": "Cetearyl",
+        r"Tetraethyl Hexandate": "Ethylhexanoate",
+        r"Propamediole": "Propanediol",
+        r"Eumonium Polyarn On Dime Thyl Taurate": "Behentrimonium Methosulfate",
+        r"Polysoreate": "Polysorbate",
+        r"Co Ceramide Np": "Ceramide NP",
+        r"Coco-Betane": "Cocamidopropyl Betaine",
+        r"Fanthenol": "Panthenol",
+        r"Ml - \. Floz\.": "",
+        r"\bAqua\b": "Water",
+        r"\bWater\b": "Water",
+        r"\bEau\b": "Water"
+    }
+    
+    for pattern, replacement in corrections.items():
+        ingredient = re.sub(pattern, replacement, ingredient, flags=re.IGNORECASE)
+    
+    # Remove size information
+    ingredient = re.sub(r"\d+\s*(ml|floz|g|oz)", "", ingredient, flags=re.IGNORECASE)
+    
+    return ingredient.strip()
+
+# --- Benchmark -----------------------------------------------------------------
+
+def load_corpus(path: Path = CORPUS_PATH) -> list[str]:
+    return [sample.strip("\n") for sample in path.read_text(encoding="utf-8").split(SAMPLE_SEPARATOR)]
+
+def check_equivalence(corpus: list[str]) -> None:
+    for index, sample in enumerate(corpus):
+        expected = legacy_process_ingredients_text(sample)
+        actual = process_ingredients_text(sample)
+        if actual != expected:
+            raise AssertionError(f"Sample {index} differs:\n  legacy:  {expected}\n  current: {actual}")
+
+def time_cleaner(cleaner, corpus: list[str], repeat: int) -> float:
+    """Best-of-five microseconds per label"""
+    runs = timeit.repeat(lambda: [cleaner(sample) for sample in corpus], number=repeat, repeat=5)
+    return min(runs) / (repeat * len(corpus)) * 1e6
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus per run")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    check_equivalence(corpus)
+    print(f"{len(corpus)} labels, outputs identical to the original cleaner")
+
+    legacy = time_cleaner(legacy_process_ingredients_text, corpus, args.repeat)
+    current = time_cleaner(process_ingredients_text, corpus, args.repeat)
+    print(f"original: {legacy:8.1f} us/label")
+    print(f"current:  {current:8.1f} us/label  ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import pytest
+from backend.app.answer_cache import question_terms, question_similarity, is_cacheable
+
+MIN_SIMILARITY = 0.6
+
+
+def is_hit(stored: str, asked: str) -> bool:
+    a, b = question_terms(stored), question_terms(asked)
+    return is_cacheable(a) and is_cacheable(b) and (a == b or question_similarity(a, b) >= MIN_SIMILARITY)
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Can I use this with retinol?", "can i use it with retinol??"),
+    ("Can I use this with retinol?", "Could I use this with retinol?"),
+    ("Can I mix this with retinoids?", "Can I layer it with retinol?"),
+    ("Is this safe for pregnancy?", "Is it safe while pregnant?"),
+    ("Is this good for acne prone skin?", "Is this product good for acne-prone skin?"),
+    ("Which ingredients are harmful for my skin?", "Which ingredients are dangerous for my skin?")
+])
+def test_rephrasings_hit(stored, asked):
+    assert is_hit(stored, asked)
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("Can I use this with retinol?", "Is there retinol in this?"),
+    ("Can I use this with retinol?", "What is retinol?"),
+    ("Should I use this with vitamin c?", "Should I use this with vitamin e?"),
+    ("Is this safe for pregnancy?", "Is this safe for breastfeeding?"),
+    ("Is this good for acne?", "Is this bad for acne?"),
+    ("Which ingredients are safe for my skin?", "Which ingredients are harmful for my skin?"),
+    ("Which ingredients are safe for my skin?", "Which ingredients are dangerous for my skin?"),
+    ("Is this safe for pregnancy?", "Is this unsafe for pregnancy?"),
+    ("Can I use this with retinol?", "Can I use this with retinol at night?")
+])
+def test_different_questions_miss(stored, asked):
+    assert not is_hit(stored, asked)
+
+
+def test_keys_keep_what_the_question_asks():
+    assert question_terms("Can I use this with retinol?") != question_terms("Is there retinol in this?")
+    assert question_terms("Is this good for acne?") != question_terms("Is this for acne?")
+    assert "c" in question_terms("Should I use this with vitamin c?")
+    assert "unsafe" in question_terms("Are any ingredients dangerous?")
+    assert question_terms("Which ingredients are harmful for my skin?") != question_terms("Which ingredients are safe for my skin?")
+
+
+@pytest.mark.parametrize("question", ["What is retinol?", "Is there retinol in this?", "Is this for acne?", "Why?"])
+def test_single_topic_questions_are_not_cached(question):
+    assert not is_cacheable(question_terms(question))
@@ -0,0 +1,109 @@
+import re
+import json
+import random
+import sys
+import pytest
+from backend.app import corrections
+from backend.app.corrections import CorrectionIndex, _trie_pattern
+
+WORDS = ["glydern", "glyder", "gly", "fanthenol", "fan", "polysoreate", "poly", "co ceramide np", "c+d"]
+
+
+def naive_pattern(words):
+    # Longest first, so the alternation is leftmost-longest like the trie
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+def test_trie_matches_naive_alternation():
+    trie = re.compile(_trie_pattern(WORDS))
+    naive = re.compile(naive_pattern(WORDS))
+    rng = random.Random(7)
+    alphabet = "glyderfanthopscmi +"
+    texts = ["".join(rng.choice(alphabet) for _ in range(60)) for _ in range(300)]
+    texts += [" ".join(WORDS), "glydernglyder gly", "polysoreatepoly fanthenol"]
+    for text in texts:
+        assert trie.findall(text) == naive.findall(text), text
+
+
+def test_trie_prefers_longest_entry():
+    assert re.fullmatch(_trie_pattern(["gly", "glydern"]), "glydern")
+    assert re.match(_trie_pattern(["gly", "glydern"]), "glyder").group() == "gly"
+
+
+@pytest.fixture
+def index():
+    return CorrectionIndex([
+        {"misread": "glydern", "correction": "Glycerin"},
+        {"misread": "aqua", "correction": "Water", "whole_word": True}
+    ], version=3)
+
+
+def test_apply_substring_and_whole_word(index):
+    assert index.apply("Glydern, Aqua, Aquaxyl") == "Glycerin, Water, Aquaxyl"
+    assert index.apply("GLYDERN") == "Glycerin"
+
+
+def test_add_and_remove_recompile(index):
+    index.add("fanthenol", "Panthenol")
+    assert index.apply("fanthenol") == "Panthenol"
+    assert index.remove("fanthenol")
+    assert not index.remove("fanthenol")
+    assert index.apply("fanthenol") == "fanthenol"
+
+
+def test_save_round_trip(index, tmp_path):
+    path = tmp_path / "corrections.json"
+    index.save(path)
+    data = json.loads(path.read_text())
+    assert data["version"] == 3
+    # Substring entries first, then whole-word ones
+    assert [entry["misread"] for entry in data["corrections"]] == ["glydern", "aqua"]
+    loaded = CorrectionIndex.load(path)
+    assert loaded.version == 3
+    assert loaded.apply("Glydern, Aqua") == "Glycerin, Water"
+
+
+def run_cli(monkeypatch, path, *args):
+    monkeypatch.setattr(sys, "argv", ["corrections", "--path", str(path), *args])
+    corrections.main()
+    return json.loads(path.read_text())
+
+
+def test_cli_add_remove_rebuild_bump_version(index, tmp_path, monkeypatch, capsys):
+    path = tmp_path / "corrections.json"
+    index.save(path)
+
+    data = run_cli(monkeypatch, path, "add", "Fanthenol", "Panthenol")
+    assert data["version"] == 4
+    assert {"misread": "fanthenol", "correction": "Panthenol", "whole_word": False} in data["corrections"]
+
+    data = run_cli(monkeypatch, path, "add", "eau", "Water", "--whole-word")
+    assert {"misread": "eau", "correction": "Water", "whole_word": True} in data["corrections"]
+
+    data = run_cli(monkeypatch, path, "remove", "fanthenol")
+    assert data["version"] == 6
+    assert all(entry["misread"] != "fanthenol" for entry in data["corrections"])
+
+    data = run_cli(monkeypatch, path, "rebuild")
+    assert data["version"] == 7
+    assert len(data["corrections"]) == 3
+
+    monkeypatch.setattr(sys, "argv", ["corrections", "--path", str(path), "apply", "glydern and eau"])
+    corrections.main()
+    assert capsys.readouterr().out.strip().endswith("Glycerin and Water")
+
+
+def test_cli_remove_unknown_fails(index, tmp_path, monkeypatch):
+    path = tmp_path / "corrections.json"
+    index.save(path)
+    monkeypatch.setattr(sys, "argv", ["corrections", "--path", str(path), "remove", "missing"])
+    with pytest.raises(SystemExit) as exit_info:
+        corrections.main()
+    assert exit_info.value.code == 1
+    assert json.loads(path.read_text())["version"] == 3
+
+
+def test_bundled_file_loads():
+    index = CorrectionIndex.load()
+    assert index.version >= 1
+    assert index.apply("glydern") == "Glycerin"
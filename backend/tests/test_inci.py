@@ -0,0 +1,65 @@
+import pytest
+from backend.app.inci import InciResolver, inci_resolver, ocr_edit_distance
+
+
+# Real ingredients missing from the bundled list that sit close to listed ones
+@pytest.mark.parametrize("token", [
+    "Imidazolidinyl Urea",
+    "Sodium Lauryl Sulfoacetate",
+    "Lauric Acid",
+    "Linoleic Acid",
+    "Ethyl Alcohol"
+])
+def test_real_ingredients_are_not_rewritten(token):
+    assert inci_resolver.canonical_name(token, fuzzy=True) == token
+    assert inci_resolver.canonical_name(token) == token
+
+
+def test_lost_number_is_not_guessed():
+    assert inci_resolver.resolve("Ceteareth-") == (None, 0.0)
+    assert inci_resolver.canonical_name("Ceteareth-", fuzzy=True) == "Ceteareth-"
+
+
+@pytest.mark.parametrize("token, expected", [
+    ("Glycerln", "Glycerin"),
+    ("Niacinamlde", "Niacinamide"),
+    ("Phenoxyethanoi", "Phenoxyethanol"),
+    ("Hyaluronlc Acid", "Hyaluronic Acid"),
+    ("Butylene Glycoi", "Butylene Glycol")
+])
+def test_ocr_misreadings_resolve(token, expected):
+    name, confidence = inci_resolver.resolve(token)
+    assert name == expected
+    assert inci_resolver.min_confidence <= confidence < 1.0
+    assert inci_resolver.canonical_name(token, fuzzy=True) == expected
+
+
+def test_fuzzy_matching_is_opt_in():
+    assert inci_resolver.canonical_name("Glycerln") == "Glycerln"
+
+
+def test_exact_and_alias_matches():
+    assert inci_resolver.resolve("glycerin") == ("Glycerin", 1.0)
+    assert inci_resolver.canonical_name("Aqua") == "Water"
+    assert inci_resolver.canonical_name("Vitamin E") == "Tocopherol"
+
+
+def test_numbers_must_agree():
+    resolver = InciResolver(["PEG-40 Stearate", "PEG-100 Stearate"], 0.9, 20, 16)
+    assert resolver.resolve("PEG-40 Stearate") == ("PEG-40 Stearate", 1.0)
+    assert resolver.resolve("PEG-4O Stearate") == (None, 0.0)
+    assert resolver.resolve("PEG- Stearate") == (None, 0.0)
+
+
+def test_ambiguous_candidates_stay_unresolved():
+    # Equally close to both names, so neither wins by the required margin
+    resolver = InciResolver(["Propanediol Alpha", "Propanediol Aipha"], 0.9, 20, 16)
+    assert resolver.resolve("Propanediol Alpho") == (None, 0.0)
+
+
+def test_ocr_edit_distance_weights():
+    assert ocr_edit_distance("glycerln", "glycerin", 2) == 0.25
+    assert ocr_edit_distance("rnethyl", "methyl", 2) == 0.5
+    assert ocr_edit_distance("lauric", "lactic", 3) == 2
+    # Past the limit the distance is reported as limit + 1
+    assert ocr_edit_distance("imidazolidinyl", "diazolidinyl", 1) == 2
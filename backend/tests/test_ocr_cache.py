@@ -0,0 +1,73 @@
+import io
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+from backend.app.cache import PerceptualHashCache
+from backend.app.config import cfg
+from backend.app.ocr import image_dhash
+
+LABEL = [
+    "Aqua, Glycerin, Niacinamide, Cetearyl Alcohol,",
+    "Caprylic/Capric Triglyceride, Dimethicone,",
+    "Panthenol, Tocopherol, Sodium Hyaluronate,",
+    "Phenoxyethanol, Ethylhexylglycerin, Citric Acid"
+]
+OTHER_LABEL = [
+    "Aqua, Butylene Glycol, Squalane, Glyceryl Stearate,",
+    "Cetyl Alcohol, Allantoin, Ceramide NP, Xanthan,",
+    "Salicylic Acid, Sodium Benzoate, Parfum, Limonene,",
+    "Potassium Sorbate, Disodium EDTA, Linalool"
+]
+# Same label with one ingredient changed
+VARIANT_LABEL = LABEL[:3] + ["Phenoxyethanol, Ethylhexylglycerin, Lactic Acid"]
+
+
+def render_label(lines, size=(1200, 900)) -> Image.Image:
+    """Ingredient panel with a fixed layout, so labels differ only in their text"""
+    image = Image.new("L", size, 235)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=34)
+    draw.text((60, 50), "INGREDIENTS:", fill=20, font=font)
+    for i, line in enumerate(lines):
+        draw.text((60, 120 + i * 52), line, fill=20, font=font)
+    return image
+
+
+def jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def cache():
+    cache = PerceptualHashCache(max_entries=16, max_distance=cfg["cache"]["ocr"]["max_distance"])
+    cache.put(image_dhash(jpeg(render_label(LABEL))), "label text")
+    return cache
+
+
+def test_reencoded_copy_hits(cache):
+    assert cache.get(image_dhash(jpeg(render_label(LABEL), quality=60))) == "label text"
+
+
+def test_different_label_with_same_layout_misses(cache):
+    assert cache.get(image_dhash(jpeg(render_label(OTHER_LABEL)))) is None
+
+
+def test_label_differing_in_one_word_misses(cache):
+    assert cache.get(image_dhash(jpeg(render_label(VARIANT_LABEL)))) is None
+
+
+def test_no_distance_separates_resized_copies_from_edited_labels():
+    original = image_dhash(jpeg(render_label(LABEL)))
+    resized = image_dhash(jpeg(render_label(LABEL).resize((600, 450)), quality=70))
+    edited = image_dhash(jpeg(render_label(VARIANT_LABEL)))
+    # Why near-duplicate matching is off by default
+    assert (original ^ edited).bit_count() <= (original ^ resized).bit_count()
+
+
+def test_near_duplicate_matching_when_enabled():
+    cache = PerceptualHashCache(max_entries=16, max_distance=2)
+    cache.put(0b1111, "text")
+    assert cache.get(0b1100) == "text"
+    assert cache.get(0b0000) is None
+    assert cache.stats()["near_hits"] == 1
@@ -0,0 +1,43 @@
+import json
+from backend.app.retrieval import BM25Index, tokenize
+
+DOCUMENTS = [
+    "Water Water solvent base",
+    "Niacinamide Niacinamide vitamin b3 that strengthens the barrier and regulates oil",
+    "Fragrance Fragrance scent; concerns: fragrance is a leading cause of skin reactions",
+    "Linalool Linalool fragrance component; concerns: declared fragrance allergen",
+    "Salicylic Acid Salicylic Acid exfoliating acid that unclogs pores; concerns: exfoliant"
+]
+
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("Which ingredients clog my pores?") == ["clog", "pore"]
+    assert tokenize("Allergies and berries") == ["allergy", "berry"]
+    assert tokenize("glass") == ["glass"]
+
+
+def test_ranking():
+    index = BM25Index.build(DOCUMENTS)
+    assert index.top_k("Will this clog my pores?", 3) == [4]
+    assert index.top_k("Is there any fragrance?", 2) == [2, 3]
+    assert index.top_k("What does niacinamide do?", 1) == [1]
+    # Nothing matches: no documents rather than arbitrary ones
+    assert index.top_k("pregnancy", 3) == []
+
+
+def test_rarer_terms_weigh_more():
+    index = BM25Index.build(DOCUMENTS)
+    assert index.idf("niacinamide") > index.idf("fragrance")
+
+
+def test_serialization_round_trip():
+    index = BM25Index.build(DOCUMENTS)
+    # Stored in MongoDB alongside the chat context
+    restored = BM25Index.from_dict(json.loads(json.dumps(index.to_dict())))
+    for query in ("fragrance allergen", "barrier oil", "acid exfoliant"):
+        assert restored.scores(query) == index.scores(query)
+
+
+def test_empty_index():
+    index = BM25Index.build([])
+    assert index.top_k("anything", 5) == []
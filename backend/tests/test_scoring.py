@@ -0,0 +1,88 @@
+from backend.app.scoring import (
+    score_ingredients, profile_tags, position_weight, backfill_assessment, assessment_disagreement, cross_check
+)
+
+
+def records(*names):
+    return [{"name": name} for name in names]
+
+
+def test_profile_tags_from_skin_type_and_concerns():
+    assert profile_tags("Oily", ["Acne breakouts", "Large pores"]) == {"oily", "acne", "pores"}
+    assert profile_tags("", None) == set()
+
+
+def test_position_weight_decreases_down_the_label():
+    weights = [position_weight(i) for i in range(10)]
+    assert weights[0] == 1
+    assert weights == sorted(weights, reverse=True)
+
+
+def test_gentle_product_for_dry_skin():
+    overall = score_ingredients(records("Water", "Glycerin", "Ceramide NP", "Niacinamide"), "dry", ["barrier repair"])
+    assert overall["safety_rating"] == "safe"
+    assert overall["barrier_impact"] == "positive"
+    assert overall["allergy_risk"] == "low"
+    assert overall["suitability_score"] >= 4
+    assert overall["key_concerns"] == []
+    assert overall["provisional"] is True
+    assert "Glycerin" in overall["personalized_notes"]
+
+
+def test_fragranced_drying_product_for_sensitive_skin():
+    overall = score_ingredients(
+        records("Water", "Alcohol Denat", "Fragrance", "Limonene", "Linalool"), "sensitive", ["redness"]
+    )
+    assert overall["safety_rating"] == "caution"
+    assert overall["barrier_impact"] == "negative"
+    assert overall["allergy_risk"] == "high"
+    assert overall["suitability_score"] <= 2
+    assert any(concern.startswith("Common allergens") for concern in overall["key_concerns"])
+    assert any(concern.startswith("May not suit") for concern in overall["key_concerns"])
+
+
+def test_same_product_scores_by_profile():
+    product = records("Water", "Isopropyl Myristate", "Glycerin")
+    acne = score_ingredients(product, "oily", ["acne"])
+    dry = score_ingredients(product, "dry", [])
+    assert acne["suitability_score"] < dry["suitability_score"]
+    assert any("Isopropyl Myristate" in concern for concern in acne["key_concerns"])
+
+
+def test_unknown_ingredients_use_record_ratings():
+    overall = score_ingredients(
+        [{"name": "Mystery Extract", "safety": "unsafe", "barrier_impact": "negative", "allergy_potential": "high"}],
+        "normal",
+        []
+    )
+    assert overall["safety_rating"] == "unsafe"
+    assert "Mystery Extract" in overall["key_concerns"][0]
+
+
+def test_backfill_only_replaces_missing_or_garbled_fields():
+    local = score_ingredients(records("Water", "Glycerin"), "dry", [])
+    overall = backfill_assessment(
+        {"safety_rating": "caution", "barrier_impact": "great", "suitability_score": "9"},
+        local
+    )
+    assert overall["safety_rating"] == "caution"
+    assert overall["barrier_impact"] == local["barrier_impact"]
+    assert overall["allergy_risk"] == local["allergy_risk"]
+    assert overall["suitability_score"] == local["suitability_score"]
+    assert overall["key_concerns"] == local["key_concerns"]
+
+
+def test_disagreement_and_cross_check():
+    product = records("Water", "Glycerin", "Ceramide NP", "Niacinamide")
+    local = score_ingredients(product, "dry", [])
+    llm = dict(local, suitability_score=local["suitability_score"] - 2, safety_rating="unsafe")
+    diff = assessment_disagreement(llm, local)
+    assert diff["suitability_score"] == -2
+    assert diff["safety_rating"] == -2
+    assert diff["barrier_impact"] == 0
+
+    stats = cross_check([{"overall_assessment": llm, "ingredients": product}, {"ingredients": []}], "dry", [])
+    assert stats["reports"] == 1
+    assert stats["suitability_gaps_of_2_or_more"] == 1
+    assert stats["agreement"]["barrier_impact"] == 1.0
+    assert stats["agreement"]["safety_rating"] == 0.0
@@ -0,0 +1,59 @@
+import json
+import pytest
+from backend.app.streaming import JSONStreamParser, sse_event
+
+REPORT = {
+    "ingredients": [
+        {"name": "Water", "special_concerns": [], "personalized_notes": "Base {not a brace}"},
+        {"name": "Fragrance", "special_concerns": ["Allergen \"parfum\""], "personalized_notes": "Avoid ]"}
+    ],
+    "overall_assessment": {"safety_rating": "caution", "suitability_score": 3, "key_concerns": ["Fragrance"]},
+    "count": 2,
+    "note": "done, finally"
+}
+
+
+def feed_all(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def expected_events():
+    return [
+        ("item", "ingredients", REPORT["ingredients"][0]),
+        ("item", "ingredients", REPORT["ingredients"][1]),
+        ("field", "ingredients", REPORT["ingredients"]),
+        ("field", "overall_assessment", REPORT["overall_assessment"]),
+        ("field", "count", 2),
+        ("field", "note", "done, finally")
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_events_do_not_depend_on_chunking(size):
+    text = "Here is the analysis:\n" + json.dumps(REPORT, indent=1)
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    parser = JSONStreamParser()
+    assert feed_all(parser, chunks) == expected_events()
+    assert parser.text == text
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    parser = JSONStreamParser()
+    first = '{"ingredients": [{"name": "Water"}'
+    assert parser.feed(first) == [("item", "ingredients", {"name": "Water"})]
+    assert parser.feed(', {"name": "Glyc') == []
+    assert parser.feed('erin"}') == [("item", "ingredients", {"name": "Glycerin"})]
+
+
+def test_malformed_item_is_skipped():
+    parser = JSONStreamParser()
+    events = parser.feed('{"ingredients": [{"name": bad}, {"name": "Water"}]}')
+    assert ("item", "ingredients", {"name": "Water"}) in events
+    assert all(value != {"name": "bad"} for _, _, value in events)
+
+
+def test_sse_event_format():
+    assert sse_event("ingredient", {"name": "Water"}) == 'event: ingredient\ndata: {"name": "Water"}\n\n'
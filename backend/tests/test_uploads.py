@@ -0,0 +1,54 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from backend.app.uploads import UploadSizeLimitMiddleware
+
+MAX_BYTES = 100_000
+BOUNDARY = "----upload-test"
+
+app = FastAPI()
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload"], max_bytes=MAX_BYTES)
+
+
+@app.post("/upload")
+async def upload(image: UploadFile = File(...)):
+    return {"size": len(await image.read())}
+
+
+client = TestClient(app)
+
+
+def chunked_body(size: int, chunk: int = 10_000):
+    """Multipart body as a generator, so it is sent chunked without a Content-Length"""
+    yield (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"label.jpg\"\r\n"
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    for _ in range(size // chunk):
+        yield b"x" * chunk
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def post_chunked(size: int):
+    return client.post(
+        "/upload",
+        content=chunked_body(size),
+        headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+
+
+def test_chunked_upload_within_limit_passes():
+    response = post_chunked(50_000)
+    assert response.request.headers.get("content-length") is None
+    assert response.status_code == 200
+    assert response.json() == {"size": 50_000}
+
+
+def test_chunked_upload_over_limit_is_rejected():
+    response = post_chunked(500_000)
+    assert response.request.headers.get("content-length") is None
+    assert response.status_code == 413
+
+
+def test_declared_length_over_limit_is_rejected():
+    response = client.post("/upload", files={"image": ("label.jpg", b"x" * (MAX_BYTES + 1))})
+    assert response.status_code == 413
@@ -1,8 +1,86 @@
 import streamlit as st
 import requests
-from utils import get_auth_header,API_BASE_URL,inject_custom_css
+from utils import get_auth_header,API_BASE_URL,inject_custom_css,iter_sse
 import re
 inject_custom_css()
+
+def render_overall_metrics(overall):
+    safety_rating = overall.get("safety_rating", "").lower()
+    safety_color = {
+        "safe": "🟢",
+        "caution": "🟡",
+        "unsafe": "🔴"
+    }.get(safety_rating, "⚪")
+
+    cols = st.columns(5)
+    metrics = [
+        ("Safety Rating", f"{safety_color} {overall.get('safety_rating', 'N/A')}"),
+        ("Suitability", f"{overall.get('suitability_score', 'N/A')}/5"),
+        ("Barrier Impact", overall.get('barrier_impact', 'N/A')),
+        ("Allergy Risk", overall.get('allergy_risk', 'N/A')),
+        ("Key Concerns", f"{len(overall.get('key_concerns', []))} found")
+    ]
+
+    for i, (label, value) in enumerate(metrics):
+        with cols[i]:
+            st.markdown(
+                f"""
+                <div class="metric-card">
+                    <div class="metric-value">{value}</div>
+                    <div class="metric-label">{label}</div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+
+def render_ingredient_card(ingredient):
+    concerns = ingredient.get('special_concerns', [])
+    concerns_html = f'<div class="ingredient-concern">Concerns: {", ".join(concerns)}</div>' if concerns else ""
+    st.markdown(
+        f"""
+        <div class="ingredient-card">
+            <div class="ingredient-name">{ingredient.get('name', 'Unknown')}</div>
+            <div class="ingredient-function">Function: {ingredient.get('function', 'N/A')}</div>
+            {concerns_html}
+            <div class="ingredient-notes">Notes: {ingredient.get('personalized_notes', 'N/A')}</div>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+def stream_analysis(response):
+    """Render a streamed analysis as it arrives and return the final report"""
+    progress = st.empty()
+    report = None
+    with progress.container():
+        status_box = st.status("🔬 Analyzing ingredients...", expanded=True)
+        overall_slot = st.empty()
+        cards = st.container()
+
+        for event, data in iter_sse(response):
+            if event == "extracted_ingredients":
+                status_box.write(f"Found ingredients: {data}")
+            elif event == "provisional":
+                with overall_slot.container():
+                    st.caption("Provisional assessment from ingredient data, refining...")
+                    render_overall_metrics(data.get("overall_assessment", {}))
+            elif event == "overall_assessment":
+                with overall_slot.container():
+                    render_overall_metrics(data)
+            elif event == "ingredient":
+                with cards:
+                    render_ingredient_card(data)
+            elif event == "complete":
+                report = data
+            elif event == "error":
+                status_box.update(label="Analysis failed", state="error")
+                st.error(f"Analysis failed: {data.get('detail', 'Unknown error')}")
+                return None
+
+    # The full report renders below once it is in session state
+    progress.empty()
+    return report
+
 def render():
     st.markdown('<div class="section">', unsafe_allow_html=True)
     st.markdown('<div class="section-header"><span class="section-header-icon"></span><h2>Analyze Skincare Product</h2></div>', unsafe_allow_html=True)
@@ -34,6 +112,8 @@ def render():
                     if response.status_code == 200:
                         st.session_state.report = response.json()
                         st.session_state.analyzed = True
+                        # A new report starts a new conversation (the server clears its session too)
+                        st.session_state.messages = []
                         st.success("🎉 Analysis complete!")
                         st.balloons()
                     else:
@@ -53,32 +133,37 @@ def render():
             st.markdown("- 📜 Flat surfaces work best")
         
         if st.button("Analyze Ingredients", use_container_width=True, key="analyze_btn"):
-            with st.spinner("🔬 Analyzing ingredients. This may take 15-30 seconds..."):
-                try:
-                    file_bytes = uploaded_file.getvalue()
-                    files = {"image": (uploaded_file.name, file_bytes, uploaded_file.type)}
-                    
+            try:
+                file_bytes = uploaded_file.getvalue()
+                files = {"image": (uploaded_file.name, file_bytes, uploaded_file.type)}
+
+                # Results stream in as the model produces them
+                with st.spinner("📖 Reading the ingredient label..."):
                     response = requests.post(
-                        f"{API_BASE_URL}/analyze-product",
+                        f"{API_BASE_URL}/analyze-product-stream",
                         headers=get_auth_header(),
-                        files=files
+                        files=files,
+                        stream=True
                     )
-                    
-                    if response.status_code == 200:
-                        st.session_state.report = response.json()
+
+                if response.status_code == 200:
+                    report = stream_analysis(response)
+                    if report:
+                        st.session_state.report = report
                         st.session_state.analyzed = True
+                        st.session_state.messages = []
                         st.success("🎉 Analysis complete!")
                         st.balloons()
-                    elif response.status_code == 400:
-                        st.error("⚠️ No ingredients found in the image. Please ensure:")
-                        st.markdown("- The ingredient list is clearly visible")
-                        st.markdown("- Text is not blurry or obscured")
-                        st.markdown("- Try capturing in better lighting")
-                    else:
-                        error_detail = response.json().get("detail", "Unknown error")
-                        st.error(f"Analysis failed: {error_detail}")
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                elif response.status_code == 400:
+                    st.error("⚠️ No ingredients found in the image. Please ensure:")
+                    st.markdown("- The ingredient list is clearly visible")
+                    st.markdown("- Text is not blurry or obscured")
+                    st.markdown("- Try capturing in better lighting")
+                else:
+                    error_detail = response.json().get("detail", "Unknown error")
+                    st.error(f"Analysis failed: {error_detail}")
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -91,35 +176,8 @@ def render():
         overall = analysis.get("overall_assessment", {})
         ingredients = analysis.get("ingredients", [])
         
-        safety_rating = overall.get("safety_rating", "").lower()
-        safety_color = {
-            "safe": "🟢",
-            "caution": "🟡",
-            "unsafe": "🔴"
-        }.get(safety_rating, "⚪")
-        
         st.subheader("Overall Assessment")
-        
-        cols = st.columns(5)
-        metrics = [
-            ("Safety Rating", f"{safety_color} {overall.get('safety_rating', 'N/A')}"),
-            ("Suitability", f"{overall.get('suitability_score', 'N/A')}/5"),
-            ("Barrier Impact", overall.get('barrier_impact', 'N/A')),
-            ("Allergy Risk", overall.get('allergy_risk', 'N/A')),
-            ("Key Concerns", f"{len(overall.get('key_concerns', []))} found")
-        ]
-        
-        for i, (label, value) in enumerate(metrics):
-            with cols[i]:
-                st.markdown(
-                    f"""
-                    <div class="metric-card">
-                        <div class="metric-value">{value}</div>
-                        <div class="metric-label">{label}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+        render_overall_metrics(overall)
         
 
         def extract_urls(text):
@@ -207,38 +265,26 @@ def render():
         if concerning_ingredients:
             st.subheader("⚠️ Ingredients with Concerns", anchor="concerns")
             for ingredient in concerning_ingredients:
-                concerns = ingredient.get('special_concerns', [])
-                st.markdown(
-                    f"""
-                    <div class="ingredient-card">
-                        <div class="ingredient-name">{ingredient.get('name', 'Unknown')}</div>
-                        <div class="ingredient-function">Function: {ingredient.get('function', 'N/A')}</div>
-                        <div class="ingredient-concern">Concerns: {', '.join(concerns)}</div>
-                        <div class="ingredient-notes">Notes: {ingredient.get('personalized_notes', 'N/A')}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+                render_ingredient_card(ingredient)
         
         if safe_ingredients:
             st.subheader("✅ Safe Ingredients")
             for ingredient in safe_ingredients:
-                st.markdown(
-                    f"""
-                    <div class="ingredient-card">
-                        <div class="ingredient-name">{ingredient.get('name', 'Unknown')}</div>
-                        <div class="ingredient-function">Function: {ingredient.get('function', 'N/A')}</div>
-                        <div class="ingredient-notes">Notes: {ingredient.get('personalized_notes', 'N/A')}</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
+                render_ingredient_card(ingredient)
         
         st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('<div class="chat-container">', unsafe_allow_html=True)
     st.markdown('<div class="section-header"><span class="section-header-icon">💬</span><h2>Ask Skincare Assistant</h2></div>', unsafe_allow_html=True)
     st.caption("Ask questions about your skincare products and get personalized advice")
+
+    if st.session_state.messages and st.button("New conversation", key="new_chat_btn"):
+        try:
+            requests.delete(f"{API_BASE_URL}/chat-session", headers=get_auth_header())
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+        st.session_state.messages = []
+        st.rerun()
     
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
@@ -250,29 +296,29 @@ def render():
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(
-                    f"{API_BASE_URL}/chat",
-                    headers=get_auth_header(),
-                    json={"question": prompt}
-                )
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    assistant_response = response_data.get("response", "I couldn't process that request")
-                    
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": assistant_response
-                    })
-                    
-                    with st.chat_message("assistant"):
-                        st.markdown(assistant_response)
-                else:
-                    st.error("Failed to get response from assistant")
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
+        try:
+            # Tokens are rendered as the model produces them
+            response = requests.post(
+                f"{API_BASE_URL}/chat-stream",
+                headers=get_auth_header(),
+                json={"question": prompt},
+                stream=True
+            )
+
+            if response.status_code == 200:
+                with st.chat_message("assistant"):
+                    assistant_response = st.write_stream(
+                        chunk for chunk in response.iter_content(chunk_size=None, decode_unicode=True) if chunk
+                    )
+
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": assistant_response or "I couldn't process that request"
+                })
+            else:
+                st.error("Failed to get response from assistant")
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
     
     st.markdown('</div>', unsafe_allow_html=True)
       
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-import base64
 import requests
 from utils import get_auth_header, display_comparison_results,API_BASE_URL
 
@@ -22,7 +21,7 @@ def render():
             if uploaded_file1:
                 products["product1"] = {
                     "input_type": "image",
-                    "input_data": base64.b64encode(uploaded_file1.getvalue()).decode("utf-8")
+                    "file": uploaded_file1
                 }
                 st.image(uploaded_file1, width=200)
                 
@@ -50,7 +49,7 @@ def render():
             if uploaded_file2:
                 products["product2"] = {
                     "input_type": "image",
-                    "input_data": base64.b64encode(uploaded_file2.getvalue()).decode("utf-8")
+                    "file": uploaded_file2
                 }
                 st.image(uploaded_file2, width=200)
                 
@@ -74,14 +73,24 @@ def render():
                 analysis_results = {}
                 product_url={}
                 for key, product in products.items():
-                    response = requests.post(
-                        f"{API_BASE_URL}/analyze-product-agent",
-                        headers=get_auth_header(),
-                        json={
-                            "input_type": product["input_type"],
-                            "input_data": product["input_data"]
-                        }
-                    )
+                    # Images go up as binary multipart parts, text as a plain form field
+                    if product["input_type"] == "image":
+                        uploaded = product["file"]
+                        response = requests.post(
+                            f"{API_BASE_URL}/analyze-product-agent",
+                            headers=get_auth_header(),
+                            data={"input_type": "image"},
+                            files={"image": (uploaded.name, uploaded.getvalue(), uploaded.type)}
+                        )
+                    else:
+                        response = requests.post(
+                            f"{API_BASE_URL}/analyze-product-agent",
+                            headers=get_auth_header(),
+                            data={
+                                "input_type": "text",
+                                "input_data": product["input_data"]
+                            }
+                        )
                     if response.status_code == 200:
                         analysis_results[key] = response.json()
 
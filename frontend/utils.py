@@ -1,4 +1,5 @@
 import base64
+import json
 import os
 import time
 import requests
@@ -319,6 +320,21 @@ def signup_user(user_data: dict) -> bool:
 def get_auth_header():
     return {"Authorization": f"Bearer {st.session_state.token}"}
 
+def iter_sse(response):
+    """Yield (event, data) pairs from a server-sent events response opened with stream=True"""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+
 def logout():
     st.session_state.token = None
     st.session_state.current_user = None